@@ -1,8 +1,20 @@
 """sql package: A package for saving and loading data with sql"""
 
-from .kreis_find import get_envelope, get_kreise
-from .stations_find import stations_find, filter_stations
+from .kreis_find import get_envelope, get_kreise, parse_envelope
+from .stations_find import stations_find, stations_stream, filter_stations
+from .stations_async import stations_harvest, stations_find_many
+from .stations_sync import sync_stations
+from .response_cache import ResponseCache
 from .save_data import SQLite
-from .fetch_data import SQLiteFetcher
+from .geometry_codec import encode_geometry, migrate_geometry
+from .geometry_pyramid import build_geometry_pyramid, level_for_zoom
+from .fetch_data import SQLiteFetcher, close_pooled_connections
+from .result_cache import ResultCache
+from .metrics import KREIS_METRICS, Metric, MetricEngine, Scale
+from .spatial_join import join_stations
+from .ingest_pipeline import ingest_kreise
+from .sharded_ingest import ingest_sharded
 from .geojson import GeoJsonHandler, import_geojson
-from .geojson2 import list_obj, list_features, export_geojson
+from .geojson2 import list_obj, list_features, iter_features, export_geojson
+from .geojson_writer import GeoJsonWriter, write_geojson
+from .topojson_export import export_topojson, load_topojson
@@ -0,0 +1,340 @@
+"""
+arcgis_query.py
+
+Shared request helpers for the ArcGIS FeatureServer clients, including a paginated
+download that is not cut off by the server's maxRecordCount.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.exceptions import RequestException
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_MAX_WORKERS = 4
+
+def request_json(base_url, params, timeout=10.0, method="get", session=None, cache=None):
+    """
+    Send a query to an ArcGIS endpoint and decode the JSON body.
+
+    :param base_url: The query URL of the feature layer.
+    :param params: The query parameters.
+    :param timeout: Request timeout in seconds.
+    :param method: 'get' or 'post'. Long objectIds lists should be posted.
+    :param session: Optional requests.Session to reuse pooled connections.
+    :param cache: Optional ResponseCache to serve and store responses.
+    :return: The decoded response, or None if the server reported an error.
+    :raises RequestException: If the request itself fails.
+    """
+    client = session if session is not None else requests
+    headers = {}
+    entry = None
+
+    if cache is not None:
+        key = cache.make_key(method, base_url, params)
+        entry = cache.get(key)
+        if entry is not None and entry["fresh"]:
+            return json.loads(entry["body"])
+        if cache.offline:
+            raise RequestException(f"No cached response for {base_url} in offline mode.")
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+    if method == "post":
+        response = client.post(base_url, data=params, headers=headers, timeout=timeout)
+    else:
+        response = client.get(base_url, params=params, headers=headers, timeout=timeout)
+
+    if entry is not None and response.status_code == 304:
+        cache.touch(key)
+        return json.loads(entry["body"])
+
+    response.raise_for_status()
+
+    data_json = json.loads(response.text)
+    if "error" in data_json:
+        print(data_json)
+        return None
+
+    if cache is not None:
+        cache.put(key, base_url, response.text,
+                  etag=response.headers.get("ETag"),
+                  last_modified=response.headers.get("Last-Modified"))
+    return data_json
+
+def fetch_object_ids(base_url, params, timeout=10.0, session=None, cache=None):
+    """
+    Fetch the sorted object IDs matching a query.
+
+    ID-only queries are not limited by maxRecordCount, so this list is complete.
+
+    :param base_url: The query URL of the feature layer.
+    :param params: The query parameters (where, geometry, ...).
+    :param timeout: Request timeout in seconds.
+    :param session: Optional requests.Session to reuse pooled connections.
+    :param cache: Optional ResponseCache to serve and store responses.
+    :return: Sorted list of object IDs, or None on a server error.
+    """
+    id_params = params.copy()
+    id_params.update({
+        "returnIdsOnly": "true",
+        "returnCountOnly": "false",
+        "returnGeometry": "false",
+    })
+    data_json = request_json(base_url, id_params, timeout, session=session, cache=cache)
+    if data_json is None:
+        return None
+    return sorted(data_json.get("objectIds") or [])
+
+def fetch_page(base_url, params, object_ids, timeout=10.0, session=None, cache=None):
+    """
+    Fetch the features for one chunk of object IDs.
+
+    If the server still flags exceededTransferLimit (the chunk is larger than its
+    maxRecordCount), the chunk is split in half and fetched again.
+
+    :param base_url: The query URL of the feature layer.
+    :param params: The query parameters.
+    :param object_ids: The object IDs of this page.
+    :param timeout: Request timeout in seconds.
+    :param session: Optional requests.Session to reuse pooled connections.
+    :param cache: Optional ResponseCache to serve and store responses.
+    :return: List of features, or None on a server error.
+    """
+    page_params = params.copy()
+    page_params.update({
+        "where": "1=1",
+        "objectIds": ",".join(map(str, object_ids)),
+        "geometry": "",
+        "returnIdsOnly": "false",
+        "returnCountOnly": "false",
+    })
+    data_json = request_json(base_url, page_params, timeout, method="post",
+                             session=session, cache=cache)
+    if data_json is None:
+        return None
+
+    if data_json.get("exceededTransferLimit") and len(object_ids) > 1:
+        middle = len(object_ids) // 2
+        first = fetch_page(base_url, params, object_ids[:middle], timeout, session, cache)
+        second = fetch_page(base_url, params, object_ids[middle:], timeout, session, cache)
+        if first is None or second is None:
+            return None
+        return first + second
+
+    return data_json.get("features", [])
+
+def fetch_features_paginated(base_url, params, page_size=DEFAULT_PAGE_SIZE,
+                             max_workers=DEFAULT_MAX_WORKERS, timeout=10.0,
+                             session=None, cache=None):
+    """
+    Download all features of a query in parallel pages.
+
+    The matching object IDs are requested first, then fetched in chunks of
+    page_size on a bounded thread pool and merged in object ID order.
+
+    :param base_url: The query URL of the feature layer.
+    :param params: The query parameters.
+    :param page_size: Number of object IDs per page.
+    :param max_workers: Maximum number of concurrent page requests.
+    :param timeout: Request timeout in seconds.
+    :param session: Optional requests.Session to reuse pooled connections.
+    :param cache: Optional ResponseCache to serve and store responses.
+    :return: List of all features, or None on a server error.
+    """
+    object_ids = fetch_object_ids(base_url, params, timeout, session, cache)
+    if object_ids is None:
+        return None
+
+    chunks = [object_ids[start:start + page_size]
+              for start in range(0, len(object_ids), page_size)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(
+            lambda chunk: fetch_page(base_url, params, chunk, timeout, session, cache), chunks
+        ))
+
+    if any(page is None for page in pages):
+        return None
+
+    return [feature for page in pages for feature in page]
+
+def check_transfer_limit(data_json):
+    """
+    Warn if a single, non-paginated response was truncated by the server.
+
+    :param data_json: The decoded response.
+    :return: True if the result is incomplete.
+    """
+    if data_json.get("exceededTransferLimit"):
+        print("Warning: result truncated by the server's maxRecordCount. "
+              "Use paginate=True to download all features.")
+        return True
+    return False
+
+class JsonStreamReader:
+    """
+    Incremental reader for a JSON document arriving in text chunks.
+
+    Only the part of the document that is currently being decoded is buffered.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size=1):
+        """Append chunks until at least min_size new characters arrived or EOF."""
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        target = len(self.buffer) + min_size
+        while len(self.buffer) < target:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                return
+            self.buffer += chunk
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError("Unexpected end of JSON stream.")
+            self.fill()
+
+    def expect(self, char):
+        """Consume the next non-whitespace character, which must be char."""
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON stream at '{self.buffer[self.pos]}'.")
+        self.pos += 1
+
+    def read_value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        decoder = json.JSONDecoder()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+                # A number or literal at the buffer end may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer geometrically so large values are not re-parsed too often
+            self.fill(max(len(self.buffer) - self.pos, 1))
+
+    def iter_object(self, stream_keys=()):
+        """
+        Iterate over the (key, value) pairs of a JSON object.
+
+        For keys in stream_keys whose value is an array, the value is a generator
+        of its elements, which must be consumed before the next pair is read.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            if key in stream_keys and self.peek() == "[":
+                yield key, self.iter_array()
+            else:
+                yield key, self.read_value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def iter_array(self):
+        """Iterate over the elements of a JSON array one at a time."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+def iter_features(base_url, params, timeout=10.0, session=None, chunk_size=64 * 1024,
+                  method="get"):
+    """
+    Stream the features of a query one at a time.
+
+    The response body is read and decoded incrementally, so memory use does not
+    grow with the number of features. Responses are not cached in this mode.
+
+    :param base_url: The query URL of the feature layer.
+    :param params: The query parameters.
+    :param timeout: Request timeout in seconds.
+    :param session: Optional requests.Session to reuse pooled connections.
+    :param chunk_size: Number of bytes read from the socket at a time.
+    :param method: 'get' or 'post'. Long objectIds lists should be posted.
+    :return: Generator of features.
+    :raises RequestException: If the request itself fails.
+    """
+    client = session if session is not None else requests
+    if method == "post":
+        response = client.post(base_url, data=params, timeout=timeout, stream=True)
+    else:
+        response = client.get(base_url, params=params, timeout=timeout, stream=True)
+
+    with response:
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        reader = JsonStreamReader(response.iter_content(chunk_size, decode_unicode=True))
+
+        for key, value in reader.iter_object(stream_keys=("features",)):
+            if key == "features":
+                yield from value
+            elif key == "error":
+                print({key: value})
+                return
+            elif key == "exceededTransferLimit":
+                check_transfer_limit({key: value})
+
+def iter_features_paginated(base_url, params, page_size=DEFAULT_PAGE_SIZE,
+                            timeout=10.0, session=None):
+    """
+    Stream all features of a query page by page.
+
+    Like fetch_features_paginated, but pages are requested one after another and
+    their features are yielded while the response is still being read.
+
+    :param base_url: The query URL of the feature layer.
+    :param params: The query parameters.
+    :param page_size: Number of object IDs per page.
+    :param timeout: Request timeout in seconds.
+    :param session: Optional requests.Session to reuse pooled connections.
+    :return: Generator of features.
+    """
+    object_ids = fetch_object_ids(base_url, params, timeout, session)
+    if object_ids is None:
+        return
+
+    for start in range(0, len(object_ids), page_size):
+        page_params = params.copy()
+        page_params.update({
+            "where": "1=1",
+            "objectIds": ",".join(map(str, object_ids[start:start + page_size])),
+            "geometry": "",
+            "returnIdsOnly": "false",
+            "returnCountOnly": "false",
+        })
+        yield from iter_features(base_url, page_params, timeout, session, method="post")
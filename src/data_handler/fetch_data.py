@@ -1,22 +1,103 @@
 """SQLiteFetcher: A Python class to fetch data from SQLite tables."""
 
+import os
+import re
 import sqlite3
-from typing import List, Dict, Any, Optional
+import threading
+from collections import namedtuple
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 import json
+import numpy as np
+import pandas as pd
+from data_handler.geometry_codec import (
+    decode_geometry, encode_geometry, is_binary_geometry, load_geometry
+)
+from data_handler.geometry_pyramid import LOD_TABLE
+from data_handler.query_builder import build_select, quote_identifier
+from data_handler.result_cache import RESULT_CACHE, ResultCache, TrackedConnection
+
+DEFAULT_CHUNK_SIZE = 1000
+ROW_TYPES = ("dict", "row", "namedtuple", "tuple")
+# "FROM table alias" / "JOIN table AS alias" in a query, for explain_query
+TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?\s+(?:AS\s+)?"?(\w+)"?', re.IGNORECASE)
+
+class ConnectionPool:
+    """Per-thread registry of long-lived, pre-configured SQLite connections."""
+
+    pragmas = {
+        "cache_size": -64000,  # KiB, keeps the hot pages in memory
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    }
+    cached_statements = 256
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def _connections(self) -> Dict[str, sqlite3.Connection]:
+        """Return the connections of the current thread."""
+        if not hasattr(self.local, "connections"):
+            self.local.connections = {}
+        return self.local.connections
+
+    def get(self, db_name: str) -> sqlite3.Connection:
+        """
+        Return the warm connection to db_name for the current thread.
+
+        The connection is opened and configured on first use and then reused,
+        keeping its page cache and prepared statement cache across callers.
+        """
+        key = os.path.abspath(db_name)
+        connections = self._connections()
+        conn = connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(db_name, cached_statements=self.cached_statements,
+                                   factory=TrackedConnection)
+            for pragma, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            connections[key] = conn
+        return conn
+
+    def close(self, db_name: Optional[str] = None) -> None:
+        """Close the current thread's connection to db_name, or all of them."""
+        connections = self._connections()
+        keys = [os.path.abspath(db_name)] if db_name else list(connections)
+        for key in keys:
+            conn = connections.pop(key, None)
+            if conn is not None:
+                conn.close()
+
+CONNECTION_POOL = ConnectionPool()
+
+def close_pooled_connections(db_name: Optional[str] = None) -> None:
+    """Close the pooled SQLiteFetcher connections of the current thread."""
+    CONNECTION_POOL.close(db_name)
 
 class SQLiteFetcher:
     """SQLiteFetcher class for handling SQLite queries."""
 
-    def __init__(self, db_name: str, kreisid: Optional[List[Any]] = None):
+    def __init__(self, db_name: str, kreisid: Optional[List[Any]] = None,
+                 pooled: bool = True, cache: Any = None):
         """
         Initialize SQLiteFetcher object.
 
         Parameters:
             db_name (str): The name of the SQLite database.
             kreisid (List[Any], optional): The list of 'kreisid' values.
+            pooled (bool): Reuse a warm per-thread connection instead of opening
+                a new one. In-memory databases are never pooled.
+            cache (Union[bool, ResultCache], optional): Cache the results of the
+                fetch_* methods. True uses the shared module-level cache. Entries
+                are dropped as soon as the database changes. In-memory databases
+                are never cached.
         """
         self.db_name = db_name
         self.kreisid = self._process_kreisid(kreisid)
+        self.pooled = pooled and db_name != ":memory:"
+        if db_name == ":memory:" or not cache:
+            self.cache = None
+        else:
+            self.cache = RESULT_CACHE if cache is True else cache
         self.conn = None
         self.cursor = None
 
@@ -29,17 +110,22 @@ class SQLiteFetcher:
         return [str(k) for k in kreisid]
 
     def __enter__(self):
-        """Create SQLite connection and cursor on entering the context."""
+        """Create or borrow a SQLite connection and a cursor on entering the context."""
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            if self.pooled:
+                self.conn = CONNECTION_POOL.get(self.db_name)
+            else:
+                self.conn = sqlite3.connect(self.db_name, factory=TrackedConnection)
             self.cursor = self.conn.cursor()
         except sqlite3.Error as error:
             print(f"SQLite error occurred: {error}")
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Close SQLite connection on exiting the context."""
-        if self.conn:
+        """Close the cursor, and the connection unless it is pooled."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn and not self.pooled:
             self.conn.close()
 
     def table_exists(self, table_name: str) -> bool:
@@ -53,152 +139,491 @@ class SQLiteFetcher:
             print(f"SQLite error occurred: {error}")
             return False
 
-    def fetch_kreise(self, **kwargs: Any) -> List[Any]:
-        """Fetch rows from 'kreis_table' based on given conditions."""
-
-        where_clauses = []
-        values = []
+    def _execute_all(self, query: str,
+                     values: List[Any]) -> Tuple[Tuple[str, ...], Tuple[Tuple[Any, ...], ...]]:
+        """
+        Run a query and return its column names and all rows, using the result cache.
 
-        for key, value in kwargs.items():
-            if isinstance(value, tuple):
-                operator, actual_value = value
-                where_clauses.append(f"{key} {operator} ?")
-                values.append(actual_value)
-            else:
-                where_clauses.append(f"{key} = ?")
-                values.append(value)
+        Raises:
+            sqlite3.Error: If the query fails.
+        """
+        if self.cache is None:
+            self.cursor.execute(query, tuple(values))
+            rows = tuple(self.cursor.fetchall())
+            return tuple(col[0] for col in self.cursor.description), rows
 
-        if self.kreisid:
-            kreisid_conditions = ", ".join(["?" for _ in self.kreisid])
-            where_clauses.append(f"KREISID IN ({kreisid_conditions})")
-            values.extend(self.kreisid)
+        version = ResultCache.db_version(self.conn, self.db_name)
+        key = ResultCache.make_key(self.db_name, query, values)
+        result = self.cache.get(key, version)
+        if result is None:
+            self.cursor.execute(query, tuple(values))
+            rows = tuple(self.cursor.fetchall())
+            result = (tuple(col[0] for col in self.cursor.description), rows)
+            self.cache.put(key, version, result)
+        return result
+
+    def _select(self, table_name: str, filter_kreisid: bool, conditions: Dict[str, Any],
+                columns: Optional[List[str]] = None,
+                any_of: Optional[List[Dict[str, Any]]] = None,
+                order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                offset: Optional[int] = None) -> Tuple[str, List[Any]]:
+        """
+        Build a SELECT with the shared query builder, adding the kreisid filter.
 
-        where_clause = " AND ".join(where_clauses)
-        query = "SELECT * FROM kreis_table"
+        Raises:
+            ValueError: On invalid identifiers, operators or ORDER BY terms.
+        """
+        conditions = list(conditions.items())
+        if self.kreisid and filter_kreisid:
+            conditions.append(("KREISID", ("IN", self.kreisid)))
+        return build_select(table_name, columns, conditions, any_of, order_by, limit, offset)
 
-        if where_clause:
-            query += f" WHERE {where_clause}"
+    def _rows_select(self, table_name: str, conditions: Dict[str, Any],
+                     *args: Any) -> Tuple[str, List[Any]]:
+        """
+        Build the query of fetch_rows, iter_rows and explain_rows, which apply
+        the kreisid filter to 'stations' only. args are as for _select.
+        """
+        return self._select(table_name, table_name == 'stations', conditions, *args)
 
+    def _fetch_dicts(self, query: str, values: List[Any]) -> List[Dict[str, Any]]:
+        """Run a query and return its rows as a list of dictionaries."""
         try:
-            self.cursor.execute(query, tuple(values))
-            rows = self.cursor.fetchall()
-
-            # Fetch column names from the cursor description
-            columns = [col[0] for col in self.cursor.description]
+            columns, rows = self._execute_all(query, values)
         except sqlite3.Error as error:
             print(f"SQLite error occurred: {error}")
             return []
 
-        # Transform rows into list of dictionaries
         return [dict(zip(columns, row)) for row in rows]
 
-    def fetch_geometry_data(self, table_name: str = 'geometry') -> List[Dict[str, Any]]:
+    def _iter_query(self, query: str, values: List[Any], chunk_size: int,
+                    row_type: str) -> Iterator[Any]:
         """
-        Fetch geometry data from a specified table based on the object's kreisid attribute.
+        Run a query on its own cursor and yield its rows chunk by chunk.
 
         Args:
-            table_name (str): Name of the table to fetch data from. Defaults to 'geometry'.
+            query (str): The SQL query.
+            values (List[Any]): The query parameters.
+            chunk_size (int): Number of rows fetched per fetchmany call.
+            row_type (str): 'dict', 'row' (sqlite3.Row), 'namedtuple' or 'tuple'.
+        """
+        if row_type not in ROW_TYPES:
+            raise ValueError(f"Invalid row_type '{row_type}'. Choose from {ROW_TYPES}")
+
+        cursor = self.conn.cursor()
+        if row_type == "row":
+            cursor.row_factory = sqlite3.Row
+        try:
+            try:
+                cursor.execute(query, tuple(values))
+            except sqlite3.Error as error:
+                print(f"SQLite error occurred: {error}")
+                return
+
+            columns = [col[0] for col in cursor.description]
+            row_class = None
+            if row_type == "namedtuple":
+                row_class = namedtuple("Row", columns, rename=True)
+
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                if row_type == "dict":
+                    yield from (dict(zip(columns, row)) for row in rows)
+                elif row_class is not None:
+                    yield from (row_class._make(row) for row in rows)
+                else:
+                    yield from rows
+        finally:
+            cursor.close()
+
+    def iter_kreise(self, chunk_size: int = DEFAULT_CHUNK_SIZE, row_type: str = "dict", *,
+                    columns: Optional[List[str]] = None,
+                    any_of: Optional[List[Dict[str, Any]]] = None,
+                    order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                    offset: Optional[int] = None, **kwargs: Any) -> Iterator[Any]:
+        """Iterate over rows of 'kreis_table' in chunks, like fetch_kreise."""
+        query, values = self._select(
+            "kreis_table", True, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self._iter_query(query, values, chunk_size, row_type)
+
+    def iter_stations(self, chunk_size: int = DEFAULT_CHUNK_SIZE, row_type: str = "dict", *,
+                      columns: Optional[List[str]] = None,
+                      any_of: Optional[List[Dict[str, Any]]] = None,
+                      order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                      offset: Optional[int] = None, **kwargs: Any) -> Iterator[Any]:
+        """Iterate over rows of 'stations' in chunks, like fetch_stations."""
+        query, values = self._select(
+            "stations", True, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self._iter_query(query, values, chunk_size, row_type)
+
+    def iter_rows(self, table_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  row_type: str = "dict", *, columns: Optional[List[str]] = None,
+                  any_of: Optional[List[Dict[str, Any]]] = None,
+                  order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                  offset: Optional[int] = None, **kwargs: Any) -> Iterator[Any]:
+        """
+        Iterate over rows of a table in chunks, like fetch_rows.
+
+        Rows are read with fetchmany, so memory use is bounded by chunk_size and
+        the first row is available before the query has been fully read.
+
+        Args:
+            table_name (str): The table to read.
+            chunk_size (int): Number of rows fetched per fetchmany call.
+            row_type (str): 'dict' (default), 'row' (sqlite3.Row), 'namedtuple'
+                or 'tuple'. The lighter types skip building a dict per row.
+            columns, any_of, order_by, limit, offset, **kwargs: As for fetch_rows.
 
         Returns:
-            List[Dict[str, Any]]: A list of dictionaries containing KREISID and associated GeoData.
+            Iterator[Any]: The rows in the requested type.
         """
-        query = f"SELECT KREISID, GeoData FROM {table_name}"
+        query, values = self._rows_select(
+            table_name, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self._iter_query(query, values, chunk_size, row_type)
 
-        values = []
-        where_clause = ""
+    def explain_query(self, query: str, values: Tuple[Any, ...] = ()) -> Dict[str, Any]:
+        """
+        Run EXPLAIN QUERY PLAN for a query and flag full table scans.
 
-        if self.kreisid:
-            kreisid_conditions = ", ".join(["?" for _ in self.kreisid])
-            where_clause = f" WHERE KREISID IN ({kreisid_conditions})"
-            values.extend(self.kreisid)
+        A plan step counts as a full scan if it reads a table, or an alias of
+        one, without any index ("SCAN stations"). Index scans, R*Tree lookups,
+        constant rows, subqueries and CTEs are not flagged.
 
-        query += where_clause
+        Args:
+            query (str): The SQL query.
+            values (Tuple[Any, ...]): The query parameters.
 
+        Returns:
+            Dict[str, Any]: 'plan' with the plan step details and 'full_scans'
+                with the names of the fully scanned tables.
+        """
         try:
-            self.cursor.execute(query, tuple(values))
-            rows = self.cursor.fetchall()
-        except sqlite3.Error as sqlite_error:
-            print(f"SQLite error occurred: {sqlite_error}")
-            return []
+            self.cursor.execute(f"EXPLAIN QUERY PLAN {query}", tuple(values))
+            plan = [row[3] for row in self.cursor.fetchall()]
+            self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            tables = {row[0].lower(): row[0] for row in self.cursor.fetchall()}
+        except sqlite3.Error as error:
+            print(f"SQLite error occurred: {error}")
+            return {"plan": [], "full_scans": []}
+
+        # Plan steps name a table by its alias if it has one
+        for table_name, alias in TABLE_ALIAS.findall(query):
+            if table_name.lower() in tables:
+                tables.setdefault(alias.lower(), tables[table_name.lower()])
+
+        full_scans = []
+        for detail in plan:
+            words = detail.split()
+            if words[0] == "SCAN" and "USING" not in words and "VIRTUAL" not in words \
+                    and words[1].strip('"').lower() in tables:
+                full_scans.append(tables[words[1].strip('"').lower()])
+
+        for table_name in full_scans:
+            print(f"Warning: query scans the whole table {table_name}.")
+        return {"plan": plan, "full_scans": full_scans}
+
+    def explain_rows(self, table_name: str, *, columns: Optional[List[str]] = None,
+                     any_of: Optional[List[Dict[str, Any]]] = None,
+                     order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                     offset: Optional[int] = None, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Explain the query fetch_rows runs for the given arguments, including
+        the kreisid filter on 'stations'.
+        """
+        query, values = self._rows_select(
+            table_name, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self.explain_query(query, tuple(values))
+
+    def _column_types(self, table_name: str) -> Dict[str, str]:
+        """Return the declared type of each column of a table."""
+        self.cursor.execute(f"PRAGMA table_info({table_name})")
+        return {column[1]: column[2].upper() for column in self.cursor.fetchall()}
+
+    @staticmethod
+    def _to_array(values: Tuple[Any, ...], declared_type: str,
+                  dtype: Optional[Any] = None) -> np.ndarray:
+        """
+        Convert one column to a typed NumPy array.
 
-        polygons = [{"KREISID": row[0], "geometry": json.loads(row[1])} for row in rows]
+        SQLite does not enforce declared types, so the dtype follows the values
+        actually stored: int64 if all are integers, float64 (NULL as NaN) if all
+        are numbers, otherwise an object array. The declared type only decides
+        columns without any values.
+        """
+        if dtype is not None:
+            return np.array(values, dtype=dtype)
+        present = [v for v in values if v is not None]
+        if present:
+            kinds = {type(v) for v in present}
+        elif "INT" in declared_type and not values:
+            kinds = {int}
+        elif any(name in declared_type for name in ("INT", "REAL", "FLOA", "DOUB")):
+            kinds = {float}
+        else:
+            kinds = {object}
+        if kinds == {int} and len(present) == len(values):
+            return np.array(values, dtype=np.int64)
+        if kinds <= {int, float}:
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def fetch_columns(self, table_name: str, columns: Optional[List[str]] = None,
+                      dtypes: Optional[Dict[str, Any]] = None, *,
+                      any_of: Optional[List[Dict[str, Any]]] = None,
+                      order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                      offset: Optional[int] = None,
+                      **kwargs: Any) -> Dict[str, np.ndarray]:
+        """
+        Fetch rows as one typed NumPy array per column instead of a dict per row.
 
-        return polygons
+        The kreisid filter is applied to every table with a KREISID column.
 
-    def fetch_stations(self, **kwargs: Any) -> List[Dict[str, Any]]:
-        """Fetch rows from 'stations' based on given conditions and return as list of dicts."""
+        Args:
+            table_name (str): The table to read.
+            columns (List[str], optional): Columns to fetch. Defaults to all.
+            dtypes (Dict[str, Any], optional): NumPy dtypes overriding the ones
+                derived from the declared column types.
+            any_of, order_by, limit, offset, **kwargs: As for fetch_rows.
 
-        where_clauses = []
-        values = []
+        Returns:
+            Dict[str, np.ndarray]: Column name to array, in the requested order.
 
-        for key, value in kwargs.items():
-            if isinstance(value, tuple):
-                operator, actual_value = value
-                where_clauses.append(f"{key} {operator} ?")
-                values.append(actual_value)
-            else:
-                where_clauses.append(f"{key} = ?")
-                values.append(value)
+        Raises:
+            ValueError: If a requested column does not exist.
+        """
+        try:
+            column_types = self._column_types(table_name)
+        except sqlite3.Error as error:
+            print(f"SQLite error occurred: {error}")
+            return {}
 
-        if self.kreisid:
-            kreisid_conditions = ", ".join(["?" for _ in self.kreisid])
-            where_clauses.append(f"KREISID IN ({kreisid_conditions})")
-            values.extend(self.kreisid)
+        columns = list(columns) if columns else list(column_types)
+        unknown = [col for col in columns if col not in column_types]
+        if unknown:
+            raise ValueError(f"Unknown column(s) {', '.join(unknown)} in {table_name}.")
 
-        where_clause = " AND ".join(where_clauses)
-        query = "SELECT * FROM stations"
+        query, values = self._select(
+            table_name, "KREISID" in column_types, kwargs, columns, any_of, order_by, limit, offset
+        )
 
-        if where_clause:
-            query += f" WHERE {where_clause}"
+        try:
+            _, rows = self._execute_all(query, values)
+        except sqlite3.Error as error:
+            print(f"SQLite error occurred: {error}")
+            return {}
 
+        # Transpose in C instead of building a dict per row
+        column_values = list(zip(*rows)) if rows else [() for _ in columns]
+        dtypes = dtypes or {}
         try:
-            self.cursor.execute(query, tuple(values))
-            rows = self.cursor.fetchall()
+            return {
+                col: self._to_array(col_values, column_types[col], dtypes.get(col))
+                for col, col_values in zip(columns, column_values)
+            }
+        except (TypeError, ValueError) as err:
+            print(f"An error occurred: {err}")
+            return {}
+
+    def fetch_dataframe(self, table_name: str, columns: Optional[List[str]] = None,
+                        **kwargs: Any) -> pd.DataFrame:
+        """Fetch rows as a pandas DataFrame built from fetch_columns."""
+        return pd.DataFrame(self.fetch_columns(table_name, columns, **kwargs))
+
+    def fetch_kreise(self, *, columns: Optional[List[str]] = None,
+                     any_of: Optional[List[Dict[str, Any]]] = None,
+                     order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                     offset: Optional[int] = None, **kwargs: Any) -> List[Any]:
+        """Fetch rows from 'kreis_table' based on given conditions, see fetch_rows."""
+        query, values = self._select(
+            "kreis_table", True, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self._fetch_dicts(query, values)
+
+    def fetch_kreis_stats(self, stats_table: str = "kreis_stats") -> List[Dict[str, Any]]:
+        """
+        Fetch rows from 'kreis_table' together with their kreis_stats aggregates.
+
+        One query joining both tables on their primary keys. The aggregate columns
+        (stations, ewz_sta, ...) replace kreis_table columns of the same name.
+        Without the stats table, see SQLite.rebuild_kreis_stats, this is fetch_kreise.
+
+        Args:
+            stats_table (str): The aggregate table. Defaults to 'kreis_stats'.
 
-            # Fetch column names from the cursor description
-            columns = [col[0] for col in self.cursor.description]
+        Returns:
+            List[Dict[str, Any]]: The rows.
+        """
+        if not self.table_exists(stats_table):
+            return self.fetch_kreise()
+
+        # table_xinfo also lists the generated ratio columns
+        self.cursor.execute(f"PRAGMA table_xinfo({quote_identifier(stats_table)})")
+        stats_columns = [column[1] for column in self.cursor.fetchall()
+                         if column[1] != "KREISID"]
+        select_list = ", ".join(["k.*"] + [f"s.{quote_identifier(col)}" for col in stats_columns])
+        query = (f"SELECT {select_list} FROM kreis_table AS k "
+                 f"LEFT JOIN {quote_identifier(stats_table)} AS s ON s.KREISID = k.KREISID")
+        if self.kreisid:
+            query += f" WHERE k.KREISID IN ({', '.join('?' for _ in self.kreisid)})"
+        return self._fetch_dicts(query, self.kreisid)
+
+    def _pyramid_levels(self) -> List[int]:
+        """Return the levels stored in the geometry pyramid, empty if there is none."""
+        if not self.table_exists(LOD_TABLE):
+            return []
+        try:
+            self.cursor.execute(f"SELECT DISTINCT level FROM {LOD_TABLE} ORDER BY level")
         except sqlite3.Error as error:
             print(f"SQLite error occurred: {error}")
             return []
+        return [row[0] for row in self.cursor.fetchall()]
 
-        # Transform rows into list of dictionaries
-        return [dict(zip(columns, row)) for row in rows]
+    def fetch_geometry_data(self, table_name: str = 'geometry', as_arrays: bool = False,
+                            level: int = 0) -> List[Dict[str, Any]]:
+        """
+        Fetch geometry data from a specified table based on the object's kreisid attribute.
 
-    def fetch_rows(self, table_name: str, **kwargs: Any) -> List[Dict[str, Any]]:
-        """Fetch rows from a table based on given conditions and return as list of dicts."""
+        Both the binary geometry format and legacy JSON text rows are read.
 
-        where_clauses = []
-        values = []
+        Args:
+            table_name (str): Name of the table to fetch data from. Defaults to 'geometry'.
+            as_arrays (bool): If True, return each geometry as NumPy 'coords' and
+                'offsets' arrays decoded straight from the binary row instead of a
+                'geometry' dict with nested 'rings' lists.
+            level (int): Level of detail. 0 reads the full resolution table_name,
+                higher levels read the simplified geometries precomputed by
+                build_geometry_pyramid (see geometry_pyramid.level_for_zoom).
+                Without a pyramid, e.g. after geometries changed, level 0 is used.
+
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries containing KREISID and associated GeoData.
 
-        for key, value in kwargs.items():
-            if isinstance(value, tuple):
-                operator, actual_value = value
-                where_clauses.append(f"{key} {operator} ?")
-                values.append(actual_value)
+        Raises:
+            ValueError: If level is not in the geometry pyramid.
+        """
+        conditions = {}
+        if level:
+            levels = self._pyramid_levels()
+            if level in levels:
+                table_name, conditions = LOD_TABLE, {"level": level}
+            elif levels:
+                raise ValueError(f"Invalid level {level}. Choose from 0, "
+                                 f"{', '.join(str(lod) for lod in levels)}.")
             else:
-                where_clauses.append(f"{key} = ?")
-                values.append(value)
+                print("Geometry pyramid not built or outdated, "
+                      "using full resolution geometries.")
+        query, values = self._select(table_name, True, conditions, ["KREISID", "GeoData"])
+
+        try:
+            _, rows = self._execute_all(query, values)
+        except sqlite3.Error as sqlite_error:
+            print(f"SQLite error occurred: {sqlite_error}")
+            return []
+
+        if as_arrays:
+            polygons = []
+            for kreis_id, geo_data in rows:
+                if is_binary_geometry(geo_data):
+                    coords, offsets = decode_geometry(geo_data)
+                else:
+                    coords, offsets = decode_geometry(encode_geometry(json.loads(geo_data)))
+                polygons.append({"KREISID": kreis_id, "coords": coords, "offsets": offsets})
+            return polygons
+
+        polygons = [{"KREISID": row[0], "geometry": load_geometry(row[1])} for row in rows]
+
+        return polygons
+
+    def fetch_stations(self, *, columns: Optional[List[str]] = None,
+                       any_of: Optional[List[Dict[str, Any]]] = None,
+                       order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                       offset: Optional[int] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        """Fetch rows from 'stations' based on given conditions, see fetch_rows."""
+        query, values = self._select(
+            "stations", True, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self._fetch_dicts(query, values)
+
+    def _fetch_in_bbox(self, table_name: str, rtree_name: str, key_column: str,
+                       bbox: Tuple[float, float, float, float],
+                       exact_clause: str) -> List[Dict[str, Any]]:
+        """Fetch rows whose R*Tree box intersects bbox, refined by exact_clause."""
+        xmin, ymin, xmax, ymax = bbox
+        values = [xmin, xmax, ymin, ymax]
+        query = (
+            f"SELECT t.* FROM {rtree_name} r JOIN {table_name} t ON t.{key_column} = r.id "
+            "WHERE r.xmax >= ? AND r.xmin <= ? AND r.ymax >= ? AND r.ymin <= ?"
+        )
+        # The R*Tree stores 32-bit floats rounded outwards, so re-check exactly
+        query += f" AND {exact_clause}"
+        values.extend([xmin, xmax, ymin, ymax])
 
-        if self.kreisid and table_name == 'stations':
+        if self.kreisid:
             kreisid_conditions = ", ".join(["?" for _ in self.kreisid])
-            where_clauses.append(f"KREISID IN ({kreisid_conditions})")
+            query += f" AND t.KREISID IN ({kreisid_conditions})"
             values.extend(self.kreisid)
 
-        where_clause = " AND ".join(where_clauses)
+        return self._fetch_dicts(query, values)
 
-        query = f"SELECT * FROM {table_name}"
-        if where_clause:
-            query += f" WHERE {where_clause}"
+    def fetch_kreise_in_bbox(self, xmin: float, ymin: float,
+                             xmax: float, ymax: float) -> List[Dict[str, Any]]:
+        """
+        Fetch the Kreise whose bounding box intersects the given box.
 
-        try:
-            self.cursor.execute(query, tuple(values))
-            rows = self.cursor.fetchall()
+        Uses the kreis_rtree index created by SQLite.create_spatial_index.
+        """
+        return self._fetch_in_bbox(
+            "kreis_table", "kreis_rtree", "KREISID", (xmin, ymin, xmax, ymax),
+            "t.xmax >= ? AND t.xmin <= ? AND t.ymax >= ? AND t.ymin <= ?"
+        )
 
-            # Fetch column names from the cursor description
-            columns = [col[0] for col in self.cursor.description]
-        except sqlite3.Error as error:
-            print(f"SQLite error occurred: {error}")
-            return []
+    def fetch_stations_in_bbox(self, xmin: float, ymin: float,
+                               xmax: float, ymax: float) -> List[Dict[str, Any]]:
+        """
+        Fetch the stations located inside the given box, e.g. a map viewport.
 
-        # Transform rows into list of dictionaries
-        return [dict(zip(columns, row)) for row in rows]
+        Uses the stations_rtree index created by SQLite.create_spatial_index.
+        """
+        return self._fetch_in_bbox(
+            "stations", "stations_rtree", "OBJECTID", (xmin, ymin, xmax, ymax),
+            't."Längengrad" >= ? AND t."Längengrad" <= ? '
+            'AND t."Breitengrad" >= ? AND t."Breitengrad" <= ?'
+        )
+
+    def fetch_rows(self, table_name: str, *, columns: Optional[List[str]] = None,
+                   any_of: Optional[List[Dict[str, Any]]] = None,
+                   order_by: Optional[List[str]] = None, limit: Optional[int] = None,
+                   offset: Optional[int] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Fetch rows from a table based on given conditions and return as list of dicts.
+
+        Args:
+            table_name (str): The table to read.
+            columns (List[str], optional): Columns to select. Defaults to all.
+            any_of (List[Dict[str, Any]], optional): Condition dicts OR-ed together
+                and AND-ed with the keyword conditions.
+            order_by (List[str], optional): 'column', 'column DESC' or '-column'.
+            limit (int, optional): Maximum number of rows.
+            offset (int, optional): Number of rows to skip.
+            **kwargs: Conditions per column: a value, a list (IN), or an
+                (operator, value) tuple such as ('>=', 3), ('IN', [...]) or
+                ('BETWEEN', (low, high)). See data_handler.query_builder.
+
+        Returns:
+            List[Dict[str, Any]]: The rows.
+
+        Raises:
+            ValueError: On invalid identifiers, operators or ORDER BY terms.
+        """
+        query, values = self._rows_select(
+            table_name, kwargs, columns, any_of, order_by, limit, offset
+        )
+        return self._fetch_dicts(query, values)
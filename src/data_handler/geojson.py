@@ -3,6 +3,11 @@
 import math
 from ipyleaflet import GeoJSON
 from data_handler import SQLiteFetcher
+from data_handler.geojson_writer import DEFAULT_PRECISION, write_geojson
+from data_handler.metrics import KREIS_METRICS
+from data_handler.save_data import MAX_QUERY_PARAMS
+
+OPACITY_METRICS = ['opac_ewz', 'opac_sta', 'opac_ewz_sta']
 
 class GeoJsonFeatureCollection:
     """Handles GeoJsonFeatureCollection"""
@@ -30,6 +35,17 @@ class GeoJsonFeatureCollection:
             "features": self.features
         }
 
+    def write_geojson(self, target, precision=DEFAULT_PRECISION, **kwargs):
+        """Stream the features to a path, file object or socket with GeoJsonWriter.
+
+        Coordinates are rounded to precision decimal places and written with
+        compact separators, one feature at a time.
+
+        Returns:
+            int: The number of written features.
+        """
+        return write_geojson(self.features, target, precision, **kwargs)
+
     def filter_and_calculate(self):
         """Filter features from geojson and calculate ewz_sta.
 
@@ -46,14 +62,11 @@ class GeoJsonFeatureCollection:
         for feature in self.features:
             try:
                 if feature['properties'].get('stations') and feature['properties'].get('ewz'):
-                    stations = feature['properties']['stations']
-                    ewz = feature['properties']['ewz']
-                    ewz_sta = ewz / stations if stations else None
-                    feature['properties']['ewz_sta'] = ewz_sta
                     filtered_features.append(feature)
             except Exception as error:# pylint: disable=W0718
                 print(f"An error occurred: {error}")
         self.features = filtered_features
+        KREIS_METRICS.apply_features(self.features, ['ewz_sta'])
 
     @staticmethod
     def set_opac(minval, maxval, val, reverse=False, base=None):
@@ -104,51 +117,10 @@ class GeoJsonFeatureCollection:
         """Calculate and assign opacity values to each feature based on its properties.
 
         This method updates each feature in self.features with new properties that
-        indicate the opacity of the feature based on 'stations' and 'ewz_sta'.
-
-        Raises:
-            Exception: An error occurred during the calculation of opacities.
+        indicate the opacity of the feature based on 'ewz', 'stations' and 'ewz_sta',
+        as defined in data_handler.metrics.KREIS_METRICS.
         """
-        min_ewz = min(
-            [feature['properties']['ewz'] for feature in self.features
-                if feature['properties']['ewz'] is not None]
-            )
-        max_ewz = max(
-            [feature['properties']['ewz'] for feature in self.features
-                if feature['properties']['ewz'] is not None]
-            )
-        min_sta = min(
-            [feature['properties']['stations'] for feature in self.features
-                if feature['properties']['stations'] is not None]
-            )
-        max_sta = max(
-            [feature['properties']['stations'] for feature in self.features
-                if feature['properties']['stations'] is not None]
-            )
-        min_ewz_sta = min(
-            [feature['properties']['ewz_sta'] for feature in self.features
-                if feature['properties']['ewz_sta'] is not None]
-            )
-        max_ewz_sta = max(
-            [feature['properties']['ewz_sta'] for feature in self.features
-                if feature['properties']['ewz_sta'] is not None]
-            )
-
-        for feature in self.features:
-            try:
-                ewz = feature['properties']['ewz']
-                stations = feature['properties']['stations']
-                ewz_sta = feature['properties']['ewz_sta']
-
-                feature['properties']['opac_ewz'] =\
-                    self.set_opac(min_ewz, max_ewz, ewz, base=10)
-                feature['properties']['opac_sta'] =\
-                    self.set_opac(min_sta, max_sta, stations, base=10)
-                feature['properties']['opac_ewz_sta'] =\
-                    self.set_opac(min_ewz_sta, max_ewz_sta, ewz_sta, reverse=True, base=10)
-
-            except Exception as error:# pylint: disable=W0718
-                print(f"An error occurred: {error}")
+        KREIS_METRICS.apply_features(self.features, OPACITY_METRICS)
 
     def export_layer(self,
                      name="Layer", style=None,
@@ -188,9 +160,11 @@ class GeoJsonFeatureCollection:
 class GeoJsonHandler:
     """Handles the conversion and manipulation of geoJSON data."""
 
-    def __init__(self, min_kreisid, max_kreisid):
+    def __init__(self, min_kreisid, max_kreisid, level=0):
         self.min_kreisid = min_kreisid
         self.max_kreisid = max_kreisid
+        # Level of detail of the geometries, 0 for full resolution
+        self.level = level
 
     @staticmethod
     def fetch_data(kreis, geo):
@@ -235,11 +209,19 @@ class GeoJsonHandler:
         """
         geojson = {"type": "FeatureCollection", "features": []}
         try:
-            for kreisid in range(self.min_kreisid, self.max_kreisid):
-                with SQLiteFetcher('../../ChargeApp.db', kreisid=kreisid) as fetcher:
-                    kreis = fetcher.fetch_kreise()
-                    geo = fetcher.fetch_geometry_data("geometry")
-                    geojson['features'].extend(self.fetch_data(kreis, geo))
+            kreisids = list(range(self.min_kreisid, self.max_kreisid))
+            for start in range(0, len(kreisids), MAX_QUERY_PARAMS):
+                chunk = kreisids[start:start + MAX_QUERY_PARAMS]
+                with SQLiteFetcher('../../ChargeApp.db', kreisid=chunk) as fetcher:
+                    # Kreise with their stations count and ratios from kreis_stats
+                    kreis = fetcher.fetch_kreis_stats()
+                    geo = fetcher.fetch_geometry_data("geometry", level=self.level)
+
+                # Pair the rows by KREISID, one query per table for the whole chunk
+                geo_by_id = {g_item['KREISID']: g_item for g_item in geo}
+                kreis = [k_item for k_item in kreis if k_item.get('KREISID') in geo_by_id]
+                geo = [geo_by_id[k_item['KREISID']] for k_item in kreis]
+                geojson['features'].extend(self.fetch_data(kreis, geo))
         except Exception as error:# pylint: disable=W0718
             print(f"An error occurred: {error}")
         return GeoJsonFeatureCollection(geojson['features'])
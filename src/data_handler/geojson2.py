@@ -1,7 +1,9 @@
 """Module for converting kreis and geo data to GeoJSON format."""
 
-from typing import List, Dict, Union, Optional, Any
+from typing import Iterable, Iterator, List, Dict, Union, Optional, Any
 from data_handler import SQLiteFetcher
+from data_handler.geojson_writer import DEFAULT_PRECISION, write_geojson
+from data_handler.save_data import MAX_QUERY_PARAMS
 
 def fetch_obj(kreisid: int,
               out: str = "kreis",
@@ -32,7 +34,7 @@ def fetch_obj(kreisid: int,
     try:
         with SQLiteFetcher(link, kreisid=kreisid) as sql_fetcher:
             if out == "kreis":
-                kreis = sql_fetcher.fetch_kreise()
+                kreis = sql_fetcher.fetch_kreis_stats()
                 if kreis:
                     obj = kreis[0]
                 else:
@@ -58,12 +60,59 @@ def fetch_obj(kreisid: int,
 
     return obj
 
+def fetch_objs(kreisids: List[int],
+               out: str = "kreis",
+               link: Optional[str] = '../../ChargeApp.db',
+               level: int = 0
+               ) -> Dict[int, Any]:
+    """Fetches data for many kreise with one query per table.
+
+    The kreisids are looked up with `KREISID IN (...)` in chunks that stay below
+    the SQLite parameter limit, and the rows are grouped by KREISID in memory.
+
+    Args:
+        kreisids: A list of Kreis IDs.
+        out: Specifies the type of output desired (kreis, geometry, stations).
+        link: The SQLite database link.
+        level: Level of detail of the geometries, 0 for full resolution.
+
+    Returns:
+        A dictionary mapping each found KREISID to its data (kreis dict,
+        geometry dict or list of stations).
+
+    Raises:
+        ValueError: If the 'out' parameter is invalid.
+    """
+    if out not in ["kreis", "geometry", "stations"]:
+        raise ValueError("Invalid value for 'out'. Choose from ['kreis', 'geometry', 'stations']")
+
+    objs = {}
+    unique_ids = list(dict.fromkeys(kreisids))
+    for start in range(0, len(unique_ids), MAX_QUERY_PARAMS):
+        chunk = unique_ids[start:start + MAX_QUERY_PARAMS]
+        with SQLiteFetcher(link, kreisid=chunk) as sql_fetcher:
+            if out == "kreis":
+                for kreis in sql_fetcher.fetch_kreis_stats():
+                    objs[kreis["KREISID"]] = kreis
+
+            elif out == "geometry":
+                for geometry in sql_fetcher.fetch_geometry_data("geometry", level=level):
+                    objs[geometry["KREISID"]] = geometry["geometry"]
+
+            elif out == "stations":
+                for station in sql_fetcher.fetch_stations():
+                    objs.setdefault(station["KREISID"], []).append(station)
+
+    return objs
+
 def list_obj(
         kreisids: Union[int, List[int]] = range(1, 402),
         out: str = "kreis",
         link: Optional[str] = '../../ChargeApp.db'
             ) -> List[List[Dict[str, Any]]]:
     """Fetches data based on the given parameters.
+
+    All kreisids are fetched in one batched query per table (see fetch_objs).
     
     Args:
         kreisids: Either a single integer or a list of integers.
@@ -71,18 +120,28 @@ def list_obj(
         link: The SQLite database link.
 
     Returns:
-        A list of dictionaries with fetched data.
+        A list of dictionaries with fetched data, None where nothing was found.
     """
     # Ensure kreisids is a list
     if isinstance(kreisids, int):
         kreisids = [kreisids]
+    kreisids = list(kreisids)
 
-    fetched_data = []
     for kreisid in kreisids:
         if kreisid < 1:
             raise ValueError("kreisid must be greater than 0")
 
-        fetched_obj = fetch_obj(kreisid, out=out, link=link)
+    try:
+        objs = fetch_objs(kreisids, out=out, link=link)
+    except Exception as error:# pylint: disable=W0718
+        print(f"An error occurred: {error}")
+        return [None for _ in kreisids]
+
+    fetched_data = []
+    for kreisid in kreisids:
+        fetched_obj = objs.get(kreisid)
+        if fetched_obj is None:
+            print(f"An error occurred: No {out} data found for kreisid {kreisid}")
         fetched_data.append(fetched_obj)
 
     return fetched_data
@@ -125,40 +184,80 @@ def featurise_obj(
     }
     return [feature]
 
-def list_features(
-        kreis_list: Union[Dict[str, Any] ,List[Dict[str, Any]]],
-        link: Optional[str] = '../../ChargeApp.db'
-        ) -> Dict[str, Any]:
-    """Fetches data based on the given list of kreise.
-    
+def iter_features(
+        kreis_list: Union[Dict[str, Any], Iterable[Dict[str, Any]]],
+        link: Optional[str] = '../../ChargeApp.db',
+        level: int = 0
+        ) -> Iterator[Dict[str, Any]]:
+    """Yields features for the given kreise, fetching geometries chunk by chunk.
+
+    Only MAX_QUERY_PARAMS kreise and their geometries are held at a time, so
+    together with export_geojson(..., target) memory use stays bounded.
+
     Args:
-        kreis_list: Either a single Dict or a list of Dicts.
+        kreis_list: Either a single Dict or an iterable of Dicts.
+        link: The SQLite database link.
+        level: Level of detail of the geometries, 0 for full resolution.
 
-    Returns:
-        A list of features with fetched data.
+    Yields:
+        The features with fetched geometries.
     """
-
-    # Ensure kreis_list is a list
     if isinstance(kreis_list, Dict):
         kreis_list = [kreis_list]
 
-    feature_list = []
+    chunk = []
     for kreis in kreis_list:
-        # Check that the first attribute of kreis is "KREISID"
+        # Check that the first attribute of each kreis is "KREISID"
         if list(kreis.keys())[0] != "KREISID":
             raise ValueError("The first attribute of the kreis dictionary must be 'KREISID'.")
+        chunk.append(kreis)
+        if len(chunk) == MAX_QUERY_PARAMS:
+            yield from _featurise_chunk(chunk, link, level)
+            chunk = []
+    if chunk:
+        yield from _featurise_chunk(chunk, link, level)
+
+def _featurise_chunk(kreis_list: List[Dict[str, Any]], link: Optional[str],
+                     level: int) -> Iterator[Dict[str, Any]]:
+    """Fetches the geometries of one chunk of kreise and yields their features."""
+    try:
+        geometries = fetch_objs([kreis["KREISID"] for kreis in kreis_list],
+                                out="geometry", link=link, level=level)
+    except Exception as error:# pylint: disable=W0718
+        print(f"An error occurred: {error}")
+        geometries = {}
+
+    for kreis in kreis_list:
+        yield featurise_obj(kreis, geometries.get(kreis["KREISID"]))[0]
 
-        kreis_id = kreis["KREISID"]
+def list_features(
+        kreis_list: Union[Dict[str, Any] ,List[Dict[str, Any]]],
+        link: Optional[str] = '../../ChargeApp.db',
+        level: int = 0
+        ) -> Dict[str, Any]:
+    """Fetches data based on the given list of kreise.
+    
+    Args:
+        kreis_list: Either a single Dict or a list of Dicts.
+        level: Level of detail of the geometries, 0 for full resolution.
 
-        geometry = fetch_obj(kreis_id, out = "geometry", link = link)
+    Returns:
+        A list of features with fetched data.
+    """
 
-        feature = featurise_obj(kreis, geometry)
-        feature_list.append(feature[0])
+    return list(iter_features(kreis_list, link=link, level=level))
 
-    return feature_list
+def export_geojson(feature_list, target=None, precision=DEFAULT_PRECISION, **kwargs):
+    """Export as GeoJson
 
-def export_geojson(feature_list):
-    """Export as GeoJson"""
+    Without a target the FeatureCollection dict is returned. With a target (a
+    path, file object or socket) the features, e.g. from iter_features, are
+    streamed one at a time with coordinates rounded to precision decimal
+    places and compact separators; the number of written features is returned.
+    Further kwargs go to GeoJsonWriter.
+    """
+    if target is not None:
+        return write_geojson(feature_list, target, precision, **kwargs)
     return {
         "type": "FeatureCollection",
         "features": feature_list
@@ -0,0 +1,185 @@
+"""Module for streaming GeoJSON FeatureCollections with quantized coordinates."""
+
+import io
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+import numpy as np
+
+DEFAULT_PRECISION = 6  # decimal places, about 0.1 m in longitude/latitude
+BUFFER_SIZE = 64 * 1024
+
+def quantize_coordinates(coordinates: Any, precision: int) -> Any:
+    """Round nested GeoJSON coordinates to precision decimal places, one array per ring."""
+    if not coordinates:
+        return coordinates
+    # A position or a list of positions (ring, line) is rounded as one array;
+    # an empty first element is an empty ring or part, so recurse into the parts
+    first = coordinates[0]
+    if isinstance(first, (int, float)) or (first and isinstance(first[0], (int, float))):
+        return np.round(np.asarray(coordinates, dtype=np.float64), precision).tolist()
+    return [quantize_coordinates(part, precision) for part in coordinates]
+
+def quantize_geometry(geometry: Optional[Dict[str, Any]],
+                      precision: int) -> Optional[Dict[str, Any]]:
+    """Return a copy of a GeoJSON geometry with rounded coordinates."""
+    if not geometry:
+        return geometry
+    if geometry.get("type") == "GeometryCollection":
+        return {**geometry, "geometries": [quantize_geometry(part, precision)
+                                           for part in geometry.get("geometries", [])]}
+    return {**geometry,
+            "coordinates": quantize_coordinates(geometry.get("coordinates"), precision)}
+
+class GeoJsonWriter:
+    """
+    Writes a FeatureCollection feature by feature to a file, stream or socket.
+
+    Only one feature is serialized at a time and output is flushed in
+    BUFFER_SIZE chunks, so memory use does not grow with the collection.
+    A path is written to a temporary file that replaces it only on success,
+    so a failed export never leaves a truncated but valid-looking file.
+    Use as a context manager:
+
+        with GeoJsonWriter('out.geojson', precision=5) as writer:
+            writer.write_features(features)
+    """
+
+    def __init__(self, target: Any, precision: Optional[int] = DEFAULT_PRECISION,
+                 property_precision: Optional[int] = None, compact: bool = True):
+        """
+        Initialize the writer.
+
+        Parameters:
+            target (Any): A path, a text or binary file object, or a socket.
+            precision (int, optional): Decimal places of the coordinates. None
+                keeps full precision.
+            property_precision (int, optional): Decimal places of float properties.
+                None keeps full precision.
+            compact (bool): Write without whitespace between tokens.
+        """
+        self.target = target
+        self.precision = precision
+        self.property_precision = property_precision
+        self.separators = (",", ":") if compact else (", ", ": ")
+        self.count = 0
+        self.buffer = []
+        self.buffered = 0
+        self.file = None
+        self.temp_path = None
+        self.owns_file = False
+        self.binary = False
+
+    def __enter__(self):
+        """Open the target and write the FeatureCollection header."""
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Finish the collection, or abort it if the block raised."""
+        self.close(success=exc_type is None)
+
+    def open(self) -> None:
+        """Open the target and write the FeatureCollection header."""
+        if isinstance(self.target, (str, os.PathLike)):
+            self.temp_path = f"{os.fspath(self.target)}.tmp"
+            self.file = open(self.temp_path, "w", encoding="utf-8")
+            self.owns_file = True
+        else:
+            self.file = self.target
+            self.binary = hasattr(self.target, "sendall") or isinstance(
+                self.target, (io.RawIOBase, io.BufferedIOBase)
+            ) or "b" in getattr(self.target, "mode", "")
+        self._write('{"type":"FeatureCollection","features":[')
+
+    def _write(self, text: str) -> None:
+        """Buffer text and flush once the buffer is full."""
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered text to the target."""
+        if not self.buffer:
+            return
+        text = "".join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        if hasattr(self.file, "sendall"):
+            self.file.sendall(text.encode("utf-8"))
+        elif self.binary:
+            self.file.write(text.encode("utf-8"))
+        else:
+            self.file.write(text)
+
+    def quantize_feature(self, feature: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the feature with rounded coordinates and float properties."""
+        if self.precision is not None and feature.get("geometry"):
+            feature = {**feature,
+                       "geometry": quantize_geometry(feature["geometry"], self.precision)}
+        if self.property_precision is not None and feature.get("properties"):
+            feature = {**feature, "properties": {
+                key: round(value, self.property_precision) if isinstance(value, float) else value
+                for key, value in feature["properties"].items()
+            }}
+        return feature
+
+    def write_feature(self, feature: Dict[str, Any]) -> None:
+        """Serialize and write one feature."""
+        text = json.dumps(self.quantize_feature(feature), separators=self.separators,
+                          ensure_ascii=False)
+        self._write(text if self.count == 0 else "," + text)
+        self.count += 1
+
+    def write_features(self, features: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write features from any iterable, e.g. a generator.
+
+        Returns:
+            int: The number of features written so far.
+        """
+        for feature in features:
+            self.write_feature(feature)
+        return self.count
+
+    def close(self, success: bool = True) -> None:
+        """
+        Write the closing brackets, flush, and close the target if it was opened here.
+
+        Parameters:
+            success (bool): If False, the collection is left unterminated, so
+                streams and sockets receive invalid JSON, and a path target is
+                not created or replaced.
+        """
+        if self.file is None:
+            return
+        completed = False
+        try:
+            if success:
+                self._write("]}")
+                self.flush()
+            if self.owns_file:
+                self.file.close()
+            elif hasattr(self.file, "flush"):
+                self.file.flush()
+            completed = success
+        finally:
+            self.file = None
+            if self.temp_path is not None:
+                if completed:
+                    os.replace(self.temp_path, self.target)
+                else:
+                    os.remove(self.temp_path)
+                self.temp_path = None
+
+def write_geojson(features: Iterable[Dict[str, Any]], target: Any,
+                  precision: Optional[int] = DEFAULT_PRECISION, **kwargs: Any) -> int:
+    """
+    Stream features as a FeatureCollection to a path, file object or socket.
+
+    Returns:
+        int: The number of written features.
+    """
+    with GeoJsonWriter(target, precision, **kwargs) as writer:
+        return writer.write_features(features)
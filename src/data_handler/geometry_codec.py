@@ -0,0 +1,129 @@
+"""
+Compact binary storage format for Kreis polygons in the geometry table.
+
+Layout (little endian):
+    4 bytes   magic b'CAG1'
+    uint32    number of rings n
+    uint32    n + 1 ring offsets, counted in points
+    float64   2 * points coordinates (x, y pairs)
+
+Decoding uses numpy.frombuffer, so reading a geometry creates no Python lists.
+"""
+
+import json
+import sqlite3
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+
+MAGIC = b"CAG1"
+HEADER_SIZE = len(MAGIC) + 4
+OFFSET_DTYPE = np.dtype("<u4")
+COORD_DTYPE = np.dtype("<f8")
+
+def encode_geometry(polygon: Dict[str, Any]) -> bytes:
+    """
+    Encode an ArcGIS polygon dict as packed coordinates plus ring offsets.
+
+    Args:
+        polygon (Dict[str, Any]): Polygon with a 'rings' list.
+
+    Returns:
+        bytes: The binary geometry.
+    """
+    rings = [np.asarray(ring, dtype=COORD_DTYPE).reshape(-1, 2) for ring in polygon["rings"]]
+    offsets = np.zeros(len(rings) + 1, dtype=OFFSET_DTYPE)
+    offsets[1:] = np.cumsum([len(ring) for ring in rings])
+    coords = np.concatenate(rings) if rings else np.empty((0, 2), dtype=COORD_DTYPE)
+    return b"".join([
+        MAGIC,
+        np.uint32(len(rings)).astype(OFFSET_DTYPE).tobytes(),
+        offsets.tobytes(),
+        coords.astype(COORD_DTYPE).tobytes(),
+    ])
+
+def is_binary_geometry(value: Any) -> bool:
+    """Check whether a GeoData value uses the binary format."""
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:4]) == MAGIC
+
+def decode_geometry(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode a binary geometry without copying the coordinates.
+
+    Args:
+        blob (bytes): The binary geometry.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Read-only (points, 2) float64 coordinates
+            and the ring offsets; ring i is coords[offsets[i]:offsets[i + 1]].
+    """
+    ring_count = int(np.frombuffer(blob, dtype=OFFSET_DTYPE, count=1, offset=len(MAGIC))[0])
+    offsets = np.frombuffer(blob, dtype=OFFSET_DTYPE, count=ring_count + 1, offset=HEADER_SIZE)
+    coords_offset = HEADER_SIZE + offsets.nbytes
+    coords = np.frombuffer(blob, dtype=COORD_DTYPE, offset=coords_offset).reshape(-1, 2)
+    return coords, offsets
+
+def split_rings(coords: np.ndarray, offsets: np.ndarray) -> List[np.ndarray]:
+    """Split decoded coordinates into one array view per ring."""
+    return [coords[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+def load_geometry(value: Union[bytes, str]) -> Dict[str, Any]:
+    """
+    Load a GeoData value in either storage format as an ArcGIS polygon dict.
+
+    Args:
+        value (Union[bytes, str]): Binary geometry or legacy JSON text.
+
+    Returns:
+        Dict[str, Any]: Polygon with 'rings' as nested lists.
+    """
+    if is_binary_geometry(value):
+        coords, offsets = decode_geometry(value)
+        return {"rings": [ring.tolist() for ring in split_rings(coords, offsets)]}
+    return json.loads(value)
+
+def geometry_bbox(value: Union[bytes, str]) -> Tuple[float, float, float, float]:
+    """
+    Compute the bounding box of a GeoData value in either storage format.
+
+    Returns:
+        Tuple[float, float, float, float]: (xmin, ymin, xmax, ymax).
+    """
+    if is_binary_geometry(value):
+        coords, _ = decode_geometry(value)
+    else:
+        coords, _ = decode_geometry(encode_geometry(json.loads(value)))
+    xmin, ymin = coords.min(axis=0)
+    xmax, ymax = coords.max(axis=0)
+    return float(xmin), float(ymin), float(xmax), float(ymax)
+
+def migrate_geometry(db_name: str, table_name: str = "geometry") -> int:
+    """
+    Convert all JSON text geometries of a table to the binary format.
+
+    The conversion runs in one transaction; rows already in binary form are skipped.
+
+    Args:
+        db_name (str): The name of the SQLite database.
+        table_name (str): The geometry table. Defaults to 'geometry'.
+
+    Returns:
+        int: Number of converted rows.
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        rows = conn.execute(
+            f"SELECT KREISID, GeoData FROM {table_name} WHERE typeof(GeoData) = 'text'"
+        ).fetchall()
+        with conn:
+            conn.executemany(
+                f"UPDATE {table_name} SET GeoData = ? WHERE KREISID = ?",
+                [(encode_geometry(json.loads(geo_data)), kreis_id)
+                 for kreis_id, geo_data in rows]
+            )
+        if rows:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    print(f"Converted {len(rows)} geometries in table {table_name} to binary format.")
+    return len(rows)
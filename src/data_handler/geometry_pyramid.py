@@ -0,0 +1,142 @@
+"""
+Module for precomputing simplified Kreis geometries at several levels of detail
+"""
+
+import sqlite3
+import numpy as np
+import shapely
+from shapely.geometry.polygon import orient
+from data_handler.geometry_codec import encode_geometry, load_geometry
+from data_handler.stations_find import polygon_geometry
+
+LOD_TABLE = "geometry_lod"
+# Simplification tolerance per level in degrees (about 100 m, 500 m and 2 km);
+# level 0 is the full resolution geometry table
+LOD_TOLERANCES = {1: 0.001, 2: 0.005, 3: 0.02}
+# Minimum map zoom at which each level is detailed enough, finest level first
+LOD_MIN_ZOOM = {0: 9, 1: 7, 2: 5, 3: 0}
+
+# Shared borders are simplified together, so any change to a full resolution
+# geometry invalidates every level; fetches then fall back to level 0 until
+# build_geometry_pyramid is run again
+LOD_TRIGGER_SCRIPT = """
+CREATE TRIGGER IF NOT EXISTS {table}_lod_insert AFTER INSERT ON {table}
+BEGIN
+    DELETE FROM {lod_table};
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_lod_update AFTER UPDATE OF KREISID, GeoData ON {table}
+WHEN OLD.KREISID IS NOT NEW.KREISID OR OLD.GeoData IS NOT NEW.GeoData
+BEGIN
+    DELETE FROM {lod_table};
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_lod_delete AFTER DELETE ON {table}
+BEGIN
+    DELETE FROM {lod_table};
+END;
+"""
+
+def level_for_zoom(zoom):
+    """
+    Picks the coarsest level of detail that still suits a map zoom level.
+
+    Parameters:
+    zoom (float): Mapbox/Leaflet zoom, e.g. from DrawMap.calculate_zoom_level.
+
+    Returns:
+    int: The level for SQLiteFetcher.fetch_geometry_data(level=...).
+    """
+    for level, min_zoom in LOD_MIN_ZOOM.items():
+        if zoom >= min_zoom:
+            return level
+    return max(LOD_MIN_ZOOM)
+
+def geometry_rings(geometry):
+    """
+    Converts a shapely (Multi)Polygon to an ArcGIS polygon dict.
+
+    Outer rings are clockwise and holes counter-clockwise, as in ArcGIS.
+    """
+    rings = []
+    for polygon in shapely.get_parts(geometry):
+        if polygon.is_empty or polygon.geom_type != "Polygon":
+            continue
+        polygon = orient(polygon, sign=-1.0)
+        rings.append(shapely.get_coordinates(polygon.exterior).tolist())
+        rings.extend(shapely.get_coordinates(ring).tolist() for ring in polygon.interiors)
+    return {"rings": rings}
+
+def simplify_coverage(geometries, tolerance):
+    """
+    Simplifies all Kreis polygons together so that shared borders stay shared.
+
+    shapely.coverage_simplify (GEOS >= 3.12) simplifies each shared edge once,
+    leaving no gaps or overlaps between neighbouring Kreise. If it is not
+    available or the polygons do not form a valid coverage, each polygon is
+    simplified on its own with preserve_topology=True.
+
+    Parameters:
+    geometries (numpy.ndarray): The Kreis (Multi)Polygons.
+    tolerance (float): The simplification tolerance in degrees.
+
+    Returns:
+    numpy.ndarray: The simplified geometries.
+    """
+    if hasattr(shapely, "coverage_simplify") and shapely.coverage_is_valid(geometries):
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+def build_geometry_pyramid(db_name, tolerances=None, table_name="geometry"):
+    """
+    Stores simplified versions of every Kreis geometry in the geometry_lod table.
+
+    The table holds one row per KREISID and level and is rebuilt completely in
+    one transaction. Triggers on table_name empty it whenever a geometry is
+    inserted, changed or deleted, so a stale pyramid is never served; run this
+    again after each ingest.
+
+    Parameters:
+    db_name (str): The name of the SQLite database.
+    tolerances (Optional[dict]): Level to tolerance. Defaults to LOD_TOLERANCES.
+    table_name (str): The full resolution geometry table.
+
+    Returns:
+    dict: Number of vertices per level, including level 0.
+    """
+    tolerances = tolerances or LOD_TOLERANCES
+    if 0 in tolerances:
+        raise ValueError("Level 0 is reserved for the full resolution geometries.")
+
+    conn = sqlite3.connect(db_name)
+    try:
+        rows = conn.execute(f"SELECT KREISID, GeoData FROM {table_name}").fetchall()
+        kreis_ids = [kreis_id for kreis_id, _ in rows]
+        geometries = np.array(
+            [polygon_geometry(load_geometry(geo_data)) for _, geo_data in rows], dtype=object
+        )
+
+        vertices = {0: int(shapely.get_num_coordinates(geometries).sum())}
+        lod_rows = []
+        for level, tolerance in sorted(tolerances.items()):
+            simplified = simplify_coverage(geometries, tolerance)
+            vertices[level] = int(shapely.get_num_coordinates(simplified).sum())
+            lod_rows.extend(
+                (kreis_id, level, encode_geometry(geometry_rings(geometry)))
+                for kreis_id, geometry in zip(kreis_ids, simplified)
+            )
+
+        with conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {LOD_TABLE} ("
+                "KREISID INTEGER, level INTEGER, GeoData BLOB, "
+                "PRIMARY KEY (KREISID, level))"
+            )
+            conn.execute(f"DELETE FROM {LOD_TABLE}")
+            conn.executemany(f"INSERT INTO {LOD_TABLE} VALUES (?, ?, ?)", lod_rows)
+        conn.executescript(LOD_TRIGGER_SCRIPT.format(table=table_name, lod_table=LOD_TABLE))
+    finally:
+        conn.close()
+
+    print("Geometry pyramid built: " + ", ".join(
+        f"level {level} {count} vertices" for level, count in vertices.items()
+    ) + ".")
+    return vertices
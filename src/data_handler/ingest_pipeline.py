@@ -0,0 +1,242 @@
+"""
+Module for ingesting Kreise and their stations in overlapping pipeline stages
+"""
+
+import queue
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from data_handler.geometry_codec import encode_geometry
+from data_handler.kreis_find import get_envelope
+from data_handler.save_data import SQLite
+from data_handler.stations_find import (
+    STATIONS_URL, StationsFinder, filter_stations, polygon_geometry
+)
+
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_PROCESS_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_BATCH_SIZE = 1000
+# Seconds a blocked put waits before checking whether the pipeline failed
+PUT_TIMEOUT = 0.5
+
+class IngestPipeline:
+    """
+    Ingests Kreise with fetcher, processor and writer stages running concurrently.
+
+    Fetcher threads download the stations inside each Kreis envelope, processor
+    threads filter them by the Kreis polygon, and a single writer thread owns
+    the only database connection (in WAL mode) and writes in batches. Bounded
+    queues between the stages apply backpressure, so network, CPU and disk
+    work overlap without unbounded buffering.
+
+    Errors in a single Kreis are reported and skipped. If the writer fails,
+    the pipeline stops feeding new Kreise, drains the queues and run raises
+    the writer error.
+
+    The kreis_table, geometry and stations tables must already exist.
+    """
+
+    def __init__(self, db_name, fetch_workers=DEFAULT_FETCH_WORKERS,
+                 process_workers=DEFAULT_PROCESS_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, cache=None):
+        """
+        Initializes the pipeline.
+
+        Parameters:
+        db_name (str): The name of the SQLite database.
+        fetch_workers (int): Number of concurrent station requests.
+        process_workers (int): Number of threads filtering stations.
+        queue_size (int): Capacity of each queue between the stages.
+        batch_size (int): Rows per table written in one transaction.
+        cache (Optional[ResponseCache]): Cache for the station requests.
+        """
+        self.db_name = db_name
+        self.fetch_workers = fetch_workers
+        self.process_workers = process_workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=fetch_workers)
+        self.session.mount('https://', adapter)
+        self.finder = StationsFinder(STATIONS_URL, session=self.session, cache=cache)
+
+        self.fetch_queue = None
+        self.process_queue = None
+        self.write_queue = None
+        self.counts = {}
+        self.failed = threading.Event()
+        self.error = None
+
+    def fail(self, error):
+        """Records the first fatal error and signals all stages."""
+        if self.error is None:
+            self.error = error
+        self.failed.set()
+
+    def put(self, target_queue, item):
+        """
+        Puts an item on a bounded queue without blocking forever.
+
+        After a failure, work items are dropped; the None shutdown markers are
+        always delivered, as every stage keeps draining its queue.
+        """
+        while True:
+            if self.failed.is_set() and item is not None:
+                return
+            try:
+                target_queue.put(item, timeout=PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+    def fetch_worker(self):
+        """Fetcher stage: download the stations inside each Kreis envelope."""
+        while True:
+            kreis = self.fetch_queue.get()
+            if kreis is None:
+                return
+            try:
+                polygon = kreis.get("geometry")
+                envelope = get_envelope(polygon) if polygon else None
+                stations = self.finder.fetch_data(geometry=envelope) if envelope else []
+                self.put(self.process_queue, (kreis, envelope, stations or []))
+            except Exception as error:# pylint: disable=W0718
+                print(f"An error occurred while fetching a kreis: {error}")
+
+    def process_worker(self):
+        """Processor stage: filter stations by polygon and build the table rows."""
+        while True:
+            item = self.process_queue.get()
+            if item is None:
+                return
+            kreis, envelope, stations = item
+            try:
+                kreis_id = kreis["attributes"]["KREISID"]
+                rows = {"kreis_table": [dict(kreis["attributes"])]}
+
+                polygon = kreis.get("geometry")
+                if polygon:
+                    rows["geometry"] = [
+                        {"KREISID": kreis_id, "GeoData": encode_geometry(polygon)}
+                    ]
+                    stations = filter_stations(polygon_geometry(polygon), stations)
+                if envelope:
+                    rows["kreis_table"][0]["envelope"] = envelope
+
+                for station in stations:
+                    station["KREISID"] = kreis_id
+                rows["stations"] = stations
+
+                self.put(self.write_queue, rows)
+            except Exception as error:# pylint: disable=W0718
+                print(f"An error occurred while processing a kreis: {error}")
+
+    def write_worker(self):
+        """Writer stage: the single owner of the database connection."""
+        key_columns = {"kreis_table": "KREISID", "geometry": "KREISID", "stations": "OBJECTID"}
+        buffers = {table_name: [] for table_name in key_columns}
+        self.counts = {table_name: {'inserted': 0, 'updated': 0, 'rejected': 0}
+                       for table_name in key_columns}
+
+        done = False
+        try:
+            with SQLite(self.db_name) as db_conn:
+                db_conn.cursor.execute("PRAGMA journal_mode=WAL")
+                db_conn.cursor.execute("PRAGMA synchronous=NORMAL")
+
+                db_conn.cursor.execute("PRAGMA table_info(kreis_table)")
+                if "envelope" not in {column[1] for column in db_conn.cursor.fetchall()}:
+                    db_conn.add_column("kreis_table", "envelope", "TEXT")
+
+                def flush(force=False):
+                    if not force and all(len(rows) < self.batch_size for rows in buffers.values()):
+                        return
+                    # Write all buffers, kreis_table first, so sub-table rows never
+                    # reach the database before their Kreis
+                    for table_name, rows in buffers.items():
+                        if rows:
+                            counts = db_conn.bulk_upsert(
+                                table_name, key_columns[table_name], rows,
+                                strict=False, batch_size=self.batch_size
+                            )
+                            for key, value in counts.items():
+                                self.counts[table_name][key] += value
+                            buffers[table_name] = []
+
+                while True:
+                    rows = self.write_queue.get()
+                    if rows is None:
+                        done = True
+                        break
+                    for table_name, table_rows in rows.items():
+                        buffers[table_name].extend(table_rows)
+                    flush()
+                flush(force=True)
+        except Exception as error:# pylint: disable=W0718
+            self.fail(error)
+            print(f"An error occurred while writing: {error}")
+            # Keep draining, so the processors never block on a full queue
+            while not done:
+                done = self.write_queue.get() is None
+
+    def run(self, kreise):
+        """
+        Runs the pipeline.
+
+        Parameters:
+        kreise (Iterable[dict]): Kreis features as returned by
+                                 get_kreise(returnGeometry=True). OBJECTID is
+                                 renamed to KREISID if needed.
+
+        Returns:
+        dict: Inserted/updated/rejected counts per table.
+
+        Raises:
+        Exception: The error that stopped the writer, e.g. a locked database.
+        """
+        self.failed.clear()
+        self.error = None
+        self.fetch_queue = queue.Queue(maxsize=self.queue_size)
+        self.process_queue = queue.Queue(maxsize=self.queue_size)
+        self.write_queue = queue.Queue(maxsize=self.queue_size)
+
+        fetchers = [threading.Thread(target=self.fetch_worker, daemon=True)
+                    for _ in range(self.fetch_workers)]
+        processors = [threading.Thread(target=self.process_worker, daemon=True)
+                      for _ in range(self.process_workers)]
+        writer = threading.Thread(target=self.write_worker, daemon=True)
+        for thread in fetchers + processors + [writer]:
+            thread.start()
+
+        try:
+            for kreis in kreise:
+                if self.failed.is_set():
+                    break
+                if "KREISID" not in kreis["attributes"]:
+                    kreis["attributes"]["KREISID"] = kreis["attributes"].pop("OBJECTID")
+                self.put(self.fetch_queue, kreis)
+        finally:
+            # Shut the stages down in order, each after its producers are done
+            for _ in fetchers:
+                self.put(self.fetch_queue, None)
+            for thread in fetchers:
+                thread.join()
+            for _ in processors:
+                self.put(self.process_queue, None)
+            for thread in processors:
+                thread.join()
+            self.put(self.write_queue, None)
+            writer.join()
+            self.session.close()
+
+        if self.error is not None:
+            raise self.error
+        return self.counts
+
+def ingest_kreise(db_name, kreise, **kwargs):
+    """
+    Function for ingesting Kreise and their stations with an IngestPipeline
+    """
+    return IngestPipeline(db_name, **kwargs).run(kreise)
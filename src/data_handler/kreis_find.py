@@ -4,17 +4,26 @@ kreis_find.py
 Fetch data from the ArcGIS API and provide functionality to query by object ID or other parameters.
 """
 
-import json
-import requests
 from requests.exceptions import RequestException
+from data_handler.arcgis_query import (
+    DEFAULT_MAX_WORKERS, DEFAULT_PAGE_SIZE, check_transfer_limit,
+    fetch_features_paginated, iter_features, iter_features_paginated, request_json
+)
+
+KREISE_URL = (
+    'https://services2.arcgis.com/jUpNdisbWqRpMo35/arcgis/'
+    'rest/services/KRS_ew_20/FeatureServer/0/query'
+)
 
 class ArcGISAPI:
     """
     A class used to interact with the ArcGIS API.
     """
 
-    def __init__(self, base_url):
+    def __init__(self, base_url, session=None, cache=None):
         self.base_url = base_url
+        self.session = session
+        self.cache = cache
         self.default_params = {
             "where": "1=1",
             "objectIds": "",
@@ -53,7 +62,8 @@ class ArcGISAPI:
             ]
 
 
-    def fetch_data(self, **kwargs):
+    def fetch_data(self, paginate=False, page_size=DEFAULT_PAGE_SIZE,
+                   max_workers=DEFAULT_MAX_WORKERS, **kwargs):
         """
         Fetch data from the ArcGIS API.
 
@@ -67,6 +77,9 @@ class ArcGISAPI:
         :param in_sr: Input spatial reference of the returned geometry.
         :param geometry: Geometry to apply as the spatial filter.
         :param geometry_type: The type of geometry specified in the geometry parameter.
+        :param paginate: True to download all features in parallel pages.
+        :param page_size: Number of objects per page when paginating.
+        :param max_workers: Maximum number of concurrent page requests.
         :return: List of features that meet the query criteria.
         """
 
@@ -74,15 +87,16 @@ class ArcGISAPI:
         params.update(kwargs)
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=10.0)
-            response.raise_for_status()
-
-            data_json = json.loads(response.text)
+            if paginate:
+                return fetch_features_paginated(self.base_url, params, page_size, max_workers,
+                                                session=self.session, cache=self.cache)
 
-            if "error" in data_json:
-                print(data_json)
+            data_json = request_json(self.base_url, params,
+                                     session=self.session, cache=self.cache)
+            if data_json is None:
                 return None
 
+            check_transfer_limit(data_json)
             features = data_json.get("features", [])
             return features
 
@@ -90,19 +104,41 @@ class ArcGISAPI:
             print(f"An error occurred while making the request: {error}")
             return None
 
-def get_kreise(**kwargs):
+    def iter_data(self, paginate=False, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+        """
+        Stream features from the ArcGIS API one at a time.
+
+        The response body is decoded incrementally instead of being loaded at once.
+        Responses are not cached in this mode.
+
+        :param paginate: True to stream all features page by page.
+        :param page_size: Number of objects per page when paginating.
+        :param kwargs: Query parameters, as for fetch_data.
+        :return: Generator of features that meet the query criteria.
+        """
+        params = self.default_params.copy()
+        params.update(kwargs)
+
+        try:
+            if paginate:
+                yield from iter_features_paginated(self.base_url, params, page_size,
+                                                   session=self.session)
+            else:
+                yield from iter_features(self.base_url, params, session=self.session)
+
+        except RequestException as error:
+            print(f"An error occurred while making the request: {error}")
+
+def get_kreise(cache=None, **kwargs):
     """
     A convenience function for fetching data from a specific ArcGIS API endpoint.
 
     :param object_id: The ID of the object to fetch.
+    :param cache: Optional ResponseCache to serve repeated queries from disk.
     :param kwargs: Additional parameters to pass to the fetch_data function.
     :return: List of features that meet the query criteria.
     """
-    base_url = (
-    'https://services2.arcgis.com/jUpNdisbWqRpMo35/arcgis/'
-    'rest/services/KRS_ew_20/FeatureServer/0/query'
-)
-    api = ArcGISAPI(base_url)
+    api = ArcGISAPI(KREISE_URL, cache=cache)
     return api.fetch_data(**kwargs)
 
 def get_envelope(polygon):
@@ -127,6 +163,19 @@ def get_envelope(polygon):
 
     return geometry
 
+def parse_envelope(envelope):
+    """
+    Parse an envelope string as returned by get_envelope into its coordinates.
+
+    :param envelope: String of the form "{xmin, ymin, xmax, ymax}".
+    :return: Tuple (xmin, ymin, xmax, ymax) of floats.
+    :raises ValueError: If the string is not a valid envelope.
+    """
+    values = [float(value) for value in envelope.strip("{}").split(",")]
+    if len(values) != 4:
+        raise ValueError(f"Invalid envelope: {envelope}")
+    return tuple(values)
+
 if __name__ == '__main__':
     try:
         ALL_DATA = get_kreise(object_id=1, return_geometry=True)
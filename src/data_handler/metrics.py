@@ -0,0 +1,350 @@
+"""
+Declarative derived metrics for Kreis features.
+
+A Metric derives a column as a ratio of two columns (or a copy of one), a Scale
+maps a column to 0..1 for map styling. Both are defined once in a MetricEngine
+and evaluated together in vectorized batches: over column arrays, over GeoJSON
+features, over a DataFrame, straight from a database (cached per database
+version) or as an SQL view over kreis_table.
+"""
+
+import sqlite3
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from data_handler.fetch_data import SQLiteFetcher
+from data_handler.query_builder import quote_identifier
+from data_handler.result_cache import RESULT_CACHE, ResultCache
+
+SCALE_METHODS = ("linear", "log", "quantile")
+
+Metric = namedtuple("Metric", ["name", "numerator", "denominator", "decimals"],
+                    defaults=[None, None])
+Metric.__doc__ = """Derived column numerator / denominator (NULL where it is 0), optionally rounded.
+decimals may be negative, e.g. -3 rounds to thousands."""
+
+Scale = namedtuple("Scale", ["name", "source", "method", "base", "reverse"],
+                   defaults=["linear", 10, False])
+Scale.__doc__ = """Column scaled to 0..1 between its min and max: 'linear', 'log' (log base
+N of value + 1) or 'quantile' (percent rank), optionally reversed. Missing
+values map to 0 (1 if reversed), a constant column to NULL."""
+
+def as_float_array(values: Sequence[Any]) -> np.ndarray:
+    """Convert values to a float64 array with NaN for None."""
+    return np.array([np.nan if value is None else value for value in values],
+                    dtype=np.float64)
+
+def ratio_values(numerator: np.ndarray, denominator: Optional[np.ndarray],
+                 decimals: Optional[int] = None) -> np.ndarray:
+    """Vectorized Metric evaluation; NaN where the denominator is 0 or missing."""
+    if denominator is None:
+        values = numerator.astype(np.float64)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(denominator != 0, numerator / denominator, np.nan)
+    if decimals is not None:
+        # Round half away from zero, as SQLite's ROUND does
+        factor = 10.0 ** decimals
+        values = np.sign(values) * np.floor(np.abs(values) * factor + 0.5) / factor
+    return values
+
+def scale_values(values: np.ndarray, method: str = "linear", base: float = 10,
+                 reverse: bool = False) -> np.ndarray:
+    """
+    Vectorized Scale evaluation.
+
+    Args:
+        values (np.ndarray): The values, NaN where missing.
+        method (str): 'linear', 'log' or 'quantile'.
+        base (float): Logarithm base for 'log'.
+        reverse (bool): Whether to reverse the direction.
+
+    Returns:
+        np.ndarray: Values between 0 and 1; 0 (1 if reverse) for missing values
+            and NaN where the range is empty.
+    """
+    if method not in SCALE_METHODS:
+        raise ValueError(f"Invalid scale method '{method}'. Choose from {SCALE_METHODS}")
+
+    missing = np.isnan(values)
+    scaled = np.full(len(values), 1.0 if reverse else 0.0)
+    if missing.all():
+        return scaled
+
+    present = values[~missing]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "quantile":
+            # Percent rank, as SQLite's PERCENT_RANK(): ties share their lowest rank
+            rank = np.searchsorted(np.sort(present), present, side="left")
+            rel_val = rank / (len(present) - 1) if len(present) > 1 else np.zeros(1)
+        else:
+            if method == "log":
+                present = np.log1p(present) / np.log(base)
+            minval, maxval = present.min(), present.max()
+            rel_val = (present - minval) / (maxval - minval) if maxval != minval \
+                else np.full(len(present), np.nan)
+
+    scaled[~missing] = 1 - rel_val if reverse else rel_val
+    return scaled
+
+class MetricEngine:
+    """Evaluates Metric and Scale definitions in vectorized batches."""
+
+    def __init__(self, definitions: Sequence[Any]):
+        """
+        Initialize the engine.
+
+        Parameters:
+            definitions (Sequence[Union[Metric, Scale]]): The definitions. Each
+                may use base columns and definitions listed before it.
+        """
+        self.definitions = {}
+        for definition in definitions:
+            if isinstance(definition, Scale) and definition.method not in SCALE_METHODS:
+                raise ValueError(f"Invalid scale method '{definition.method}' "
+                                 f"for {definition.name}.")
+            self.definitions[definition.name] = definition
+
+    def inputs(self, name: str) -> List[str]:
+        """Return the columns a definition reads directly."""
+        definition = self.definitions[name]
+        if isinstance(definition, Scale):
+            return [definition.source]
+        return [col for col in (definition.numerator, definition.denominator) if col]
+
+    def base_columns(self, name: str) -> List[str]:
+        """Return the base (non-derived) columns a definition depends on."""
+        columns = []
+        for column in self.inputs(name):
+            if column in self.definitions:
+                columns.extend(self.base_columns(column))
+            else:
+                columns.append(column)
+        return list(dict.fromkeys(columns))
+
+    def resolve(self, names: Optional[Sequence[str]],
+                available: Sequence[str]) -> List[str]:
+        """
+        Return the definitions to evaluate, dependencies first.
+
+        Without names, all definitions whose base columns are available are
+        used; requested names with missing base columns raise a KeyError.
+        """
+        available = set(available)
+        if names is None:
+            names = [name for name in self.definitions
+                     if set(self.base_columns(name)) <= available]
+        for name in names:
+            if name not in self.definitions:
+                raise KeyError(f"Unknown metric '{name}'.")
+            missing = set(self.base_columns(name)) - available
+            if missing:
+                raise KeyError(f"Metric '{name}' needs missing column(s) "
+                               f"{', '.join(sorted(missing))}.")
+
+        order = []
+        def visit(name):
+            for column in self.inputs(name):
+                if column in self.definitions and column not in available:
+                    visit(column)
+            if name not in order:
+                order.append(name)
+        for name in names:
+            visit(name)
+        return order
+
+    def needed_columns(self, names: Optional[Sequence[str]],
+                       available: Sequence[str]) -> List[str]:
+        """Return the available base columns the definitions to evaluate read."""
+        columns = []
+        for name in self.resolve(names, available):
+            columns.extend(col for col in self.base_columns(name) if col in available)
+        return list(dict.fromkeys(columns))
+
+    def evaluate(self, columns: Dict[str, Sequence[Any]],
+                 names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Evaluate definitions over column arrays.
+
+        Parameters:
+            columns (Dict[str, Sequence[Any]]): Base columns, None/NaN where missing.
+            names (Sequence[str], optional): Definitions to return. Defaults to
+                all that can be computed from the given columns.
+
+        Returns:
+            Dict[str, np.ndarray]: The requested columns, NaN where undefined.
+        """
+        values = {name: as_float_array(column) for name, column in columns.items()}
+        order = self.resolve(names, list(values))
+        for name in order:
+            definition = self.definitions[name]
+            if isinstance(definition, Scale):
+                values[name] = scale_values(values[definition.source], definition.method,
+                                            definition.base, definition.reverse)
+            else:
+                values[name] = ratio_values(
+                    values[definition.numerator],
+                    values[definition.denominator] if definition.denominator else None,
+                    definition.decimals
+                )
+        return {name: values[name] for name in (names or order)}
+
+    def apply_features(self, features: List[Dict[str, Any]],
+                       names: Optional[Sequence[str]] = None) -> None:
+        """
+        Evaluate definitions over GeoJSON features and write them to their properties.
+
+        Each needed property is extracted once, NaN results are written as None.
+        """
+        if not features:
+            return
+        present = set().union(*(feature['properties'] for feature in features))
+        present -= set(self.definitions)
+        columns = {col: [feature['properties'].get(col) for feature in features]
+                   for col in self.needed_columns(names, present)}
+
+        results = self.evaluate(columns, names)
+        results = {name: np.where(np.isnan(values), None, values).tolist()
+                   for name, values in results.items()}
+        for index, feature in enumerate(features):
+            for name, values in results.items():
+                feature['properties'][name] = values[index]
+
+    def apply_frame(self, frame: pd.DataFrame,
+                    names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Return a copy of a DataFrame with the evaluated columns added."""
+        available = [col for col in frame.columns if col not in self.definitions]
+        numeric = {col: pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float64)
+                   for col in self.needed_columns(names, available)}
+        result = frame.copy()
+        for name, values in self.evaluate(numeric, names).items():
+            result[name] = values
+        return result
+
+    def evaluate_db(self, db_name: str, names: Optional[Sequence[str]] = None,
+                    table_name: str = "kreis_table",
+                    cache: Optional[ResultCache] = RESULT_CACHE) -> Dict[str, np.ndarray]:
+        """
+        Evaluate definitions over a table, cached per database version.
+
+        Returns:
+            Dict[str, np.ndarray]: KREISID and the evaluated columns as read-only
+                arrays. The cached result is reused until the database changes.
+        """
+        with SQLiteFetcher(db_name) as fetcher:
+            version = ResultCache.db_version(fetcher.conn, db_name)
+            key = ResultCache.make_key(
+                db_name, f"metrics {table_name} {tuple(self.definitions.values())!r}",
+                tuple(names or ())
+            )
+            result = cache.get(key, version) if cache is not None else None
+            if result is not None:
+                return result
+
+            table_info = fetcher.conn.execute(
+                f"PRAGMA table_info({quote_identifier(table_name)})"
+            )
+            available = [column[1] for column in table_info
+                         if column[1] not in self.definitions]
+            columns = fetcher.fetch_columns(
+                table_name, ["KREISID"] + self.needed_columns(names, available)
+            )
+            result = {"KREISID": columns.pop("KREISID", None)}
+            result.update(self.evaluate(columns, names))
+            for values in result.values():
+                if values is not None:
+                    values.flags.writeable = False
+            if cache is not None:
+                cache.put(key, version, result)
+        return result
+
+    def sql_expressions(self, available: Sequence[str],
+                        names: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """Return the SQL expression of each definition, inlining dependencies."""
+        expressions = {col: quote_identifier(col) for col in available}
+        order = self.resolve(names, list(available))
+        for name in order:
+            definition = self.definitions[name]
+            if isinstance(definition, Scale):
+                expressions[name] = self._scale_sql(expressions[definition.source], definition)
+                continue
+
+            value = f"CAST({expressions[definition.numerator]} AS REAL)"
+            if definition.denominator:
+                value += f" / NULLIF({expressions[definition.denominator]}, 0)"
+            if definition.decimals is not None and definition.decimals < 0:
+                factor = 10 ** -definition.decimals
+                value = f"ROUND(({value}) / {factor}) * {factor}"
+            elif definition.decimals is not None:
+                value = f"ROUND({value}, {definition.decimals})"
+            expressions[name] = f"({value})"
+        return {name: expressions[name] for name in (names or order)}
+
+    @staticmethod
+    def _scale_sql(source: str, scale: Scale) -> str:
+        """Return the window-function SQL of a Scale."""
+        if scale.method == "quantile":
+            rel_val = (f"CASE WHEN {source} IS NULL THEN NULL ELSE PERCENT_RANK() OVER "
+                       f"(PARTITION BY {source} IS NULL ORDER BY {source}) END")
+        else:
+            value = f"ln(1 + {source}) / ln({scale.base})" if scale.method == "log" else source
+            rel_val = (f"({value} - MIN({value}) OVER ()) / "
+                       f"NULLIF(MAX({value}) OVER () - MIN({value}) OVER (), 0)")
+        if scale.reverse:
+            rel_val = f"1 - ({rel_val})"
+        missing = 1 if scale.reverse else 0
+        return f"(CASE WHEN {source} IS NULL THEN {missing} ELSE {rel_val} END)"
+
+    def create_view(self, db_name: str, view_name: str = "kreis_metrics",
+                    table_name: str = "kreis_table",
+                    names: Optional[Sequence[str]] = None) -> bool:
+        """
+        Create (or replace) a view with all columns of a table plus the metrics.
+
+        Metrics whose base columns the table lacks are left out unless named.
+        Log scales need SQLite's math functions (3.35+).
+
+        Returns:
+            bool: Whether the view was created.
+        """
+        conn = sqlite3.connect(db_name)
+        try:
+            columns = [column[1] for column in
+                       conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})")]
+            expressions = self.sql_expressions(columns, names)
+            select_list = ", ".join(
+                ["*"] + [f"{expr} AS {quote_identifier(name)}"
+                         for name, expr in expressions.items()]
+            )
+            with conn:
+                conn.execute(f"DROP VIEW IF EXISTS {quote_identifier(view_name)}")
+                conn.execute(
+                    f"CREATE VIEW {quote_identifier(view_name)} AS "
+                    f"SELECT {select_list} FROM {quote_identifier(table_name)}"
+                )
+                # Views are compiled lazily, so check the expressions now
+                conn.execute(f"SELECT * FROM {quote_identifier(view_name)} LIMIT 1").fetchall()
+        except sqlite3.Error as error:
+            conn.execute(f"DROP VIEW IF EXISTS {quote_identifier(view_name)}")
+            print(f"SQLite error occurred: {error}")
+            return False
+        finally:
+            conn.close()
+
+        print(f"View {view_name} created with {len(expressions)} metric(s).")
+        return True
+
+KREIS_METRICS = MetricEngine([
+    Metric("ewz_sta", "ewz", "stations"),
+    Metric("population", "ewz", decimals=-3),
+    Metric("stations_per_pop", "stations", "ewz", 4),
+    Metric("pop_per_station", "ewz", "stations", 0),
+    Metric("cars_per_pop", "cars", "ewz", 3),
+    Metric("ev_per_pop", "cars_electric", "ewz", 3),
+    Metric("ev_per_car", "cars_electric", "cars", 3),
+    Metric("ev_per_station", "cars_electric", "stations", 2),
+    Scale("opac_ewz", "ewz", "log", 10),
+    Scale("opac_sta", "stations", "log", 10),
+    Scale("opac_ewz_sta", "ewz_sta", "log", 10, reverse=True),
+])
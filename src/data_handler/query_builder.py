@@ -0,0 +1,181 @@
+"""
+Shared SELECT builder for SQLiteFetcher.
+
+Conditions are given as keyword arguments, one per column:
+    column=value                     column = ?  (column IS NULL for None)
+    column=[a, b]                    column IN (?, ?)
+    column=(operator, value)         column <operator> ?, e.g. ('>=', 3)
+    column=('IN', [a, b])            also 'NOT IN'
+    column=('BETWEEN', (low, high))  also 'NOT BETWEEN'
+All conditions are AND-ed; any_of adds a group of condition dicts that are
+OR-ed together.
+
+Identifiers are validated and quoted, values are always bound as parameters.
+The statement text only depends on the shape of the query, not on the values,
+so it is built once per shape and SQLite's statement cache can reuse it.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+Conditions = Union[Dict[str, Any], Sequence[Tuple[str, Any]]]
+
+IDENTIFIER = re.compile(r"^[^\W\d]\w*$")
+COMPARISON_OPERATORS = {
+    "=", "==", "!=", "<>", "<", "<=", ">", ">=",
+    "IS", "IS NOT", "LIKE", "NOT LIKE", "GLOB", "NOT GLOB",
+}
+LIST_OPERATORS = {"IN", "NOT IN"}
+RANGE_OPERATORS = {"BETWEEN", "NOT BETWEEN"}
+ORDER_DIRECTIONS = {"ASC", "DESC"}
+
+def quote_identifier(name: str) -> str:
+    """
+    Validate a table or column name and return it double-quoted.
+
+    Raises:
+        ValueError: If the name is not a plain identifier.
+    """
+    if not isinstance(name, str) or not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier '{name}'.")
+    return f'"{name}"'
+
+def _condition(column: str, value: Any) -> Tuple[Tuple[Any, ...], List[Any]]:
+    """Return the shape (column, operator, value count) and values of one condition."""
+    quote_identifier(column)
+    if isinstance(value, tuple):
+        operator, operand = value
+        operator = " ".join(str(operator).upper().split())
+    elif isinstance(value, (list, set, frozenset)):
+        operator, operand = "IN", value
+    elif value is None:
+        operator, operand = "IS", None
+    else:
+        operator, operand = "=", value
+
+    if operator in LIST_OPERATORS:
+        operand = list(operand)
+        return (column, operator, len(operand)), operand
+    if operator in RANGE_OPERATORS:
+        low, high = operand
+        return (column, operator, 2), [low, high]
+    if operator in COMPARISON_OPERATORS:
+        return (column, operator, 1), [operand]
+    raise ValueError(f"Unsupported operator '{operator}' for column '{column}'.")
+
+def _conditions(conditions: Conditions) -> Tuple[Tuple[Any, ...], List[Any]]:
+    """Return the shapes and values of AND-ed conditions (a dict or (column, value) pairs)."""
+    if isinstance(conditions, dict):
+        conditions = conditions.items()
+    shapes = []
+    values = []
+    for column, value in conditions:
+        shape, condition_values = _condition(column, value)
+        shapes.append(shape)
+        values.extend(condition_values)
+    return tuple(shapes), values
+
+def _order_by(order_by: Optional[Sequence[str]]) -> Tuple[Tuple[str, str], ...]:
+    """Normalize 'column', 'column DESC' or '-column' entries to (column, direction)."""
+    if order_by is None:
+        return ()
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    terms = []
+    for term in order_by:
+        parts = term.split()
+        column, direction = parts[0], (parts[1].upper() if len(parts) > 1 else "ASC")
+        if column.startswith("-"):
+            column, direction = column[1:], "DESC"
+        if len(parts) > 2 or direction not in ORDER_DIRECTIONS:
+            raise ValueError(f"Invalid ORDER BY term '{term}'.")
+        quote_identifier(column)
+        terms.append((column, direction))
+    return tuple(terms)
+
+def _condition_sql(shapes: Tuple[Tuple[Any, ...], ...]) -> List[str]:
+    """Render condition shapes as SQL."""
+    clauses = []
+    for column, operator, count in shapes:
+        column = quote_identifier(column)
+        if operator in LIST_OPERATORS:
+            placeholders = ", ".join(["?"] * count)
+            clauses.append(f"{column} {operator} ({placeholders})")
+        elif operator in RANGE_OPERATORS:
+            clauses.append(f"{column} {operator} ? AND ?")
+        else:
+            clauses.append(f"{column} {operator} ?")
+    return clauses
+
+@lru_cache(maxsize=256)
+def select_statement(table_name: str, columns: Tuple[str, ...],
+                     where: Tuple[Tuple[Any, ...], ...],
+                     any_of: Tuple[Tuple[Tuple[Any, ...], ...], ...],
+                     order_by: Tuple[Tuple[str, str], ...],
+                     has_limit: bool, has_offset: bool) -> str:
+    """Render the statement text for a query shape. Cached per shape."""
+    column_list = ", ".join(quote_identifier(col) for col in columns) if columns else "*"
+    query = f"SELECT {column_list} FROM {quote_identifier(table_name)}"
+
+    clauses = _condition_sql(where)
+    if any_of:
+        group = " OR ".join(
+            f"({' AND '.join(_condition_sql(shapes))})" if shapes else "1"
+            for shapes in any_of
+        )
+        clauses.append(f"({group})")
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+
+    if order_by:
+        query += " ORDER BY " + ", ".join(
+            f"{quote_identifier(col)} {direction}" for col, direction in order_by
+        )
+    if has_limit or has_offset:
+        query += " LIMIT ?"
+    if has_offset:
+        query += " OFFSET ?"
+    return query
+
+def build_select(table_name: str, columns: Optional[Sequence[str]] = None,
+                 conditions: Optional[Conditions] = None,
+                 any_of: Optional[Sequence[Conditions]] = None,
+                 order_by: Optional[Sequence[str]] = None,
+                 limit: Optional[int] = None,
+                 offset: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """
+    Build a parameterized SELECT statement.
+
+    Args:
+        table_name (str): The table to read.
+        columns (Sequence[str], optional): Columns to select. Defaults to all.
+        conditions (Conditions, optional): AND-ed conditions as a dict or
+            (column, value) pairs, see the module docs.
+        any_of (Sequence[Dict[str, Any]], optional): Condition dicts OR-ed together.
+        order_by (Sequence[str], optional): 'column', 'column DESC' or '-column'.
+        limit (int, optional): Maximum number of rows.
+        offset (int, optional): Number of rows to skip.
+
+    Returns:
+        Tuple[str, List[Any]]: The statement text and its parameters.
+
+    Raises:
+        ValueError: On invalid identifiers, operators or ORDER BY terms.
+    """
+    where, values = _conditions(conditions or {})
+    any_of_shapes = []
+    for group in any_of or []:
+        shapes, group_values = _conditions(group)
+        any_of_shapes.append(shapes)
+        values.extend(group_values)
+
+    query = select_statement(
+        table_name, tuple(columns or ()), where, tuple(any_of_shapes),
+        _order_by(order_by), limit is not None, offset is not None
+    )
+    if limit is not None or offset is not None:
+        values.append(-1 if limit is None else int(limit))
+    if offset is not None:
+        values.append(int(offset))
+    return query, values
@@ -0,0 +1,168 @@
+"""
+response_cache.py
+
+A persistent, size-bounded cache for ArcGIS query responses stored in a SQLite file.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache with TTL expiry and LRU eviction.
+
+    Entries are keyed by the method, URL and normalized query parameters. Stale
+    entries that carry an ETag or Last-Modified header are revalidated with a
+    conditional request instead of being downloaded again. In offline mode the
+    network is never used, which makes a filled cache usable as a replay fixture.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+        """
+        Initializes the cache.
+
+        Parameters:
+        path (str): Path of the SQLite file holding the cache.
+        ttl (float): Seconds an entry is served without revalidation.
+        max_bytes (int): Upper bound of the total size of all cached bodies.
+        offline (bool): If True, serve cached entries regardless of age and
+                        never send requests.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY NOT NULL, "
+            "url TEXT, "
+            "body BLOB, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "stored_at REAL, "
+            "accessed_at REAL, "
+            "size INTEGER)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close the cache file."""
+        with self.lock:
+            self.conn.close()
+
+    @staticmethod
+    def make_key(method, url, params):
+        """
+        Build the cache key from the request.
+
+        Empty and None parameters are dropped (requests does not send them either)
+        and the remaining ones are sorted, so equivalent queries share one entry.
+        """
+        normalized = sorted(
+            (str(key), str(value)) for key, value in params.items()
+            if value is not None and value != ""
+        )
+        raw = json.dumps([method.lower(), url, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up an entry.
+
+        Returns:
+        Optional[dict]: The entry with 'body', 'etag', 'last_modified' and 'fresh',
+                        or None if the key is not cached.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self.conn.commit()
+
+        body, etag, last_modified, stored_at = row
+        return {
+            "body": body.decode("utf-8"),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": self.offline or time.time() - stored_at < self.ttl
+        }
+
+    def put(self, key, url, body, etag=None, last_modified=None):
+        """
+        Store a response body and evict least recently used entries if needed.
+        """
+        data = body.encode("utf-8")
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO responses "
+                "(key, url, body, etag, last_modified, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET url = excluded.url, body = excluded.body, "
+                "etag = excluded.etag, last_modified = excluded.last_modified, "
+                "stored_at = excluded.stored_at, accessed_at = excluded.accessed_at, "
+                "size = excluded.size",
+                (key, url, data, etag, last_modified, now, now, len(data))
+            )
+            self.evict()
+            self.conn.commit()
+
+    def touch(self, key):
+        """
+        Mark an entry as fresh again after a successful revalidation.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key)
+            )
+            self.conn.commit()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits into max_bytes.
+
+        Must be called with the lock held.
+        """
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        stale_keys = []
+        for key, size in self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def clear(self):
+        """Remove all entries."""
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
@@ -0,0 +1,129 @@
+"""ResultCache: An in-process LRU cache for SQLiteFetcher query results."""
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+class TrackedConnection(sqlite3.Connection):
+    """A sqlite3.Connection that ResultCache can track by weak reference."""
+
+class ResultCache:
+    """
+    LRU cache of query results, bounded by an estimate of their size in bytes.
+
+    Entries are grouped per database file and dropped as soon as a reading
+    connection sees a new database version: either its `PRAGMA data_version`
+    (which changes when another connection, e.g. `SQLite`, commits) or the
+    modification time and size of the database and its WAL file changed since
+    that connection last looked. The versions are held per connection only as
+    long as the connection is alive (see TrackedConnection); other connections
+    always count as a new version.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Parameters:
+            max_bytes (int): Upper bound of the estimated size of all entries.
+        """
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self.versions = weakref.WeakKeyDictionary()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(db_name: str, query: str, values: Tuple[Any, ...]) -> Hashable:
+        """Build the key from the database, whitespace-normalized query and parameters."""
+        return (os.path.abspath(db_name), re.sub(r"\s+", " ", query.strip()), tuple(values))
+
+    @staticmethod
+    def db_version(conn: Any, db_name: str) -> Tuple[Any, ...]:
+        """
+        Return the connection and a token that changes with the database content.
+
+        data_version is only comparable within one connection, so the token is
+        tracked per connection.
+        """
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        file_stats = []
+        for path in (db_name, f"{db_name}-wal"):
+            try:
+                stat = os.stat(path)
+                file_stats.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                file_stats.append(None)
+        return conn, (data_version, *file_stats)
+
+    @staticmethod
+    def estimate_size(value: Any) -> int:
+        """Roughly estimate the memory held by a cached result."""
+        if isinstance(value, (tuple, list)):
+            return sys.getsizeof(value) + sum(ResultCache.estimate_size(v) for v in value)
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(
+                ResultCache.estimate_size(k) + ResultCache.estimate_size(v)
+                for k, v in value.items()
+            )
+        return sys.getsizeof(value)
+
+    def validate(self, db_key: str, version: Tuple[Any, ...]) -> None:
+        """Drop all entries of a database if the connection saw a new version."""
+        conn, token = version
+        try:
+            seen = self.versions.setdefault(conn, {})
+        except TypeError:
+            # Not weak-referenceable, e.g. a plain sqlite3.Connection
+            seen = {}
+        if seen.get(db_key) == token:
+            return
+        for key in [key for key in self.entries if key[0] == db_key]:
+            _, size = self.entries.pop(key)
+            self.size -= size
+        seen[db_key] = token
+
+    def get(self, key: Hashable, version: Tuple[Any, ...]) -> Optional[Any]:
+        """Return the cached result for key at the given version, or None."""
+        with self.lock:
+            self.validate(key[0], version)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, version: Tuple[Any, ...], value: Any) -> None:
+        """Store a result and evict least recently used entries if needed."""
+        size = self.estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self.validate(key[0], version)
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self.lock:
+            self.entries.clear()
+            self.versions.clear()
+            self.size = 0
+
+RESULT_CACHE = ResultCache()
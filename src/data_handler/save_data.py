@@ -3,6 +3,157 @@ This module provides a SQLite class to handle SQLite database operations.
 """
 
 import sqlite3
+from itertools import islice
+from data_handler.geometry_codec import geometry_bbox
+from data_handler.kreis_find import parse_envelope
+from data_handler.metrics import KREIS_METRICS, Metric
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds
+MAX_QUERY_PARAMS = 900
+
+BBOX_COLUMNS = ["xmin", "ymin", "xmax", "ymax"]
+
+SPATIAL_INDEX_SCRIPT = """
+CREATE VIRTUAL TABLE IF NOT EXISTS kreis_rtree USING rtree(id, xmin, xmax, ymin, ymax);
+CREATE VIRTUAL TABLE IF NOT EXISTS stations_rtree USING rtree(id, xmin, xmax, ymin, ymax);
+
+CREATE TRIGGER IF NOT EXISTS kreis_rtree_insert AFTER INSERT ON kreis_table
+WHEN NEW.xmin IS NOT NULL AND NEW.ymin IS NOT NULL
+    AND NEW.xmax IS NOT NULL AND NEW.ymax IS NOT NULL
+BEGIN
+    INSERT OR REPLACE INTO kreis_rtree VALUES (NEW.KREISID, NEW.xmin, NEW.xmax, NEW.ymin, NEW.ymax);
+END;
+CREATE TRIGGER IF NOT EXISTS kreis_rtree_update
+AFTER UPDATE OF KREISID, xmin, ymin, xmax, ymax ON kreis_table
+BEGIN
+    DELETE FROM kreis_rtree WHERE id = OLD.KREISID;
+    INSERT INTO kreis_rtree SELECT NEW.KREISID, NEW.xmin, NEW.xmax, NEW.ymin, NEW.ymax
+    WHERE NEW.xmin IS NOT NULL AND NEW.ymin IS NOT NULL
+        AND NEW.xmax IS NOT NULL AND NEW.ymax IS NOT NULL;
+END;
+CREATE TRIGGER IF NOT EXISTS kreis_rtree_delete AFTER DELETE ON kreis_table
+BEGIN
+    DELETE FROM kreis_rtree WHERE id = OLD.KREISID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS kreis_bbox_insert AFTER INSERT ON kreis_table
+WHEN NEW.xmin IS NULL AND json_valid('[' || trim(NEW.envelope, '{}') || ']')
+BEGIN
+    UPDATE kreis_table SET
+        xmin = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[0]'),
+        ymin = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[1]'),
+        xmax = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[2]'),
+        ymax = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[3]')
+    WHERE KREISID = NEW.KREISID;
+END;
+CREATE TRIGGER IF NOT EXISTS kreis_bbox_update AFTER UPDATE OF envelope ON kreis_table
+WHEN json_valid('[' || trim(NEW.envelope, '{}') || ']')
+BEGIN
+    UPDATE kreis_table SET
+        xmin = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[0]'),
+        ymin = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[1]'),
+        xmax = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[2]'),
+        ymax = json_extract('[' || trim(NEW.envelope, '{}') || ']', '$[3]')
+    WHERE KREISID = NEW.KREISID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stations_rtree_insert AFTER INSERT ON stations
+WHEN NEW."Längengrad" IS NOT NULL AND NEW."Breitengrad" IS NOT NULL
+BEGIN
+    INSERT OR REPLACE INTO stations_rtree VALUES (NEW.OBJECTID,
+        NEW."Längengrad", NEW."Längengrad", NEW."Breitengrad", NEW."Breitengrad");
+END;
+CREATE TRIGGER IF NOT EXISTS stations_rtree_update
+AFTER UPDATE OF OBJECTID, "Längengrad", "Breitengrad" ON stations
+BEGIN
+    DELETE FROM stations_rtree WHERE id = OLD.OBJECTID;
+    INSERT INTO stations_rtree SELECT NEW.OBJECTID,
+        NEW."Längengrad", NEW."Längengrad", NEW."Breitengrad", NEW."Breitengrad"
+    WHERE NEW."Längengrad" IS NOT NULL AND NEW."Breitengrad" IS NOT NULL;
+END;
+CREATE TRIGGER IF NOT EXISTS stations_rtree_delete AFTER DELETE ON stations
+BEGIN
+    DELETE FROM stations_rtree WHERE id = OLD.OBJECTID;
+END;
+"""
+
+KREIS_STATS_TABLE = "kreis_stats"
+# kreis_table columns copied into kreis_stats, if present, as inputs of the ratios
+KREIS_STATS_SOURCES = ["ewz", "cars", "cars_electric"]
+KREIS_STATS_TRIGGERS = [
+    "kreis_stats_kreis_insert", "kreis_stats_kreis_update", "kreis_stats_kreis_delete",
+    "kreis_stats_station_insert", "kreis_stats_station_update", "kreis_stats_station_delete",
+]
+
+def kreis_stats_script(sources, ratios):
+    """
+    Creates the SQL script for the kreis_stats table and its triggers.
+
+    kreis_stats has one row per row of kreis_table. A new Kreis counts its
+    stations once, after that the count is maintained incrementally by triggers
+    on stations and the source columns by triggers on kreis_table. The ratios
+    are stored generated columns, so SQLite recomputes them whenever a row changes.
+
+    Parameters:
+    sources (dict): kreis_table column to declared type, copied into kreis_stats.
+    ratios (dict): Ratio name to its SQL expression over stations and the sources.
+
+    Returns:
+    str: The SQL script.
+    """
+    column_defs = ",\n    ".join(
+        ["KREISID INTEGER PRIMARY KEY NOT NULL", "stations INTEGER NOT NULL DEFAULT 0"]
+        + [f"{col} {dtype}" for col, dtype in sources.items()]
+        + [f"{name} REAL GENERATED ALWAYS AS {expr} STORED" for name, expr in ratios.items()]
+    )
+    insert_columns = "".join(f", {col}" for col in sources)
+    insert_values = "".join(f", NEW.{col}" for col in sources)
+    conflict_action = "DO UPDATE SET " + ", ".join(
+        f"{col} = excluded.{col}" for col in sources
+    ) if sources else "DO NOTHING"
+
+    script = f"""
+CREATE TABLE IF NOT EXISTS {KREIS_STATS_TABLE} (
+    {column_defs}
+);
+
+CREATE TRIGGER IF NOT EXISTS kreis_stats_kreis_insert AFTER INSERT ON kreis_table
+BEGIN
+    INSERT INTO {KREIS_STATS_TABLE} (KREISID, stations{insert_columns})
+    VALUES (NEW.KREISID, (SELECT COUNT(*) FROM stations WHERE KREISID = NEW.KREISID)
+        {insert_values})
+    ON CONFLICT(KREISID) {conflict_action};
+END;
+CREATE TRIGGER IF NOT EXISTS kreis_stats_kreis_delete AFTER DELETE ON kreis_table
+BEGIN
+    DELETE FROM {KREIS_STATS_TABLE} WHERE KREISID = OLD.KREISID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS kreis_stats_station_insert AFTER INSERT ON stations
+BEGIN
+    UPDATE {KREIS_STATS_TABLE} SET stations = stations + 1 WHERE KREISID = NEW.KREISID;
+END;
+CREATE TRIGGER IF NOT EXISTS kreis_stats_station_update AFTER UPDATE OF KREISID ON stations
+WHEN OLD.KREISID IS NOT NEW.KREISID
+BEGIN
+    UPDATE {KREIS_STATS_TABLE} SET stations = stations - 1 WHERE KREISID = OLD.KREISID;
+    UPDATE {KREIS_STATS_TABLE} SET stations = stations + 1 WHERE KREISID = NEW.KREISID;
+END;
+CREATE TRIGGER IF NOT EXISTS kreis_stats_station_delete AFTER DELETE ON stations
+BEGIN
+    UPDATE {KREIS_STATS_TABLE} SET stations = stations - 1 WHERE KREISID = OLD.KREISID;
+END;
+"""
+    if sources:
+        update_pairs = ", ".join(f"{col} = NEW.{col}" for col in sources)
+        script += f"""
+CREATE TRIGGER IF NOT EXISTS kreis_stats_kreis_update
+AFTER UPDATE OF {', '.join(sources)} ON kreis_table
+BEGIN
+    UPDATE {KREIS_STATS_TABLE} SET {update_pairs} WHERE KREISID = NEW.KREISID;
+END;
+"""
+    return script
 
 class SQLite:
     """
@@ -26,6 +177,8 @@ class SQLite:
         """
         self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor()
+        # INSERT OR REPLACE fires the delete triggers that maintain kreis_stats
+        self.cursor.execute("PRAGMA recursive_triggers = ON")
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -113,13 +266,17 @@ class SQLite:
         except sqlite3.Error as err:
             print(f"An error occurred: {err}")
 
-    def create_table(self, table_name, columns):
+    def create_table(self, table_name, columns, indexes=None):
         """
         Creates a table if it does not already exist.
 
         Parameters:
         table_name (str): The name of the table to create.
         columns (dict): The columns and their data types.
+        indexes (list, optional): Indexes to create with the table. Each entry is
+                                  a column name, a list of column names for a
+                                  composite index, or a dict with 'columns' and
+                                  optionally 'unique' and 'name'.
         """
         if self.table_exists(table_name):
             self.prompt_to_drop_table(table_name)
@@ -128,14 +285,26 @@ class SQLite:
         self.execute_create_table(create_table_query)
         print(f"Table {table_name} created.")
 
-    def create_sub_table(self, table_name, columns, reference_key):
+        for index in indexes or []:
+            if isinstance(index, dict):
+                self.create_index(table_name, index['columns'],
+                                  unique=index.get('unique', False), name=index.get('name'))
+            else:
+                self.create_index(table_name, index)
+
+    def create_sub_table(self, table_name, columns, reference_key, indexes=None):
         """
         Creates a sub-table with a foreign key reference to another table.
 
+        The foreign key column is indexed automatically, so lookups by the parent
+        key (e.g. all stations of a Kreis) do not scan the whole table. A foreign
+        key that leads the primary key (e.g. geometry.KREISID) is already indexed.
+
         Parameters:
         table_name (str): The name of the sub-table.
         columns (dict): The columns and their data types.
         reference_key (dict): Information about the foreign key reference.
+        indexes (list, optional): Further indexes, as for create_table.
         """
         if not self.table_exists(reference_key['table']):
             print(f"Reference table {reference_key['table']} does not exist.")
@@ -145,7 +314,95 @@ class SQLite:
                 f"REFERENCES {reference_key['table']}({reference_key['reference_column']})"
             )
         })
-        self.create_table(table_name, columns)
+        self.create_table(table_name, columns, indexes)
+
+        self.cursor.execute(f"PRAGMA table_info({table_name})")
+        primary_key = [column[1] for column in self.cursor.fetchall() if column[5] == 1]
+        if reference_key['column'] not in primary_key + list(indexes or []):
+            self.create_index(table_name, reference_key['column'])
+
+    def create_index(self, table_name, columns, unique=False, name=None):
+        """
+        Creates an index on one or more columns if it does not already exist.
+
+        Parameters:
+        table_name (str): The name of the table.
+        columns (Union[str, list]): The column or columns to index.
+        unique (bool): Whether to create a UNIQUE index.
+        name (str, optional): The index name. Defaults to idx_<table>_<columns>.
+
+        Returns:
+        str: The name of the index.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        name = name or f"idx_{table_name}_{'_'.join(columns)}"
+        column_list = ", ".join(f'"{col}"' for col in columns)
+        unique_clause = "UNIQUE " if unique else ""
+
+        try:
+            self.cursor.execute(
+                f'CREATE {unique_clause}INDEX IF NOT EXISTS "{name}" '
+                f"ON {table_name} ({column_list})"
+            )
+            self.conn.commit()
+            print(f"Index {name} created on table {table_name}.")
+        except sqlite3.Error as err:
+            print(f"An error occurred: {err}")
+        return name
+
+    def list_indexes(self, table_name):
+        """
+        Lists the indexes of a table.
+
+        Parameters:
+        table_name (str): The name of the table.
+
+        Returns:
+        dict: Index name to the list of its columns, in index order.
+        """
+        self.cursor.execute(f"PRAGMA index_list({table_name})")
+        index_names = [index[1] for index in self.cursor.fetchall()]
+        indexes = {}
+        for index_name in index_names:
+            self.cursor.execute(f'PRAGMA index_info("{index_name}")')
+            indexes[index_name] = [column[2] for column in self.cursor.fetchall()]
+        return indexes
+
+    def index_foreign_keys(self):
+        """
+        Creates the missing indexes on foreign key columns of all tables.
+
+        For databases created before create_sub_table indexed foreign keys. A
+        foreign key counts as indexed if some index, or the primary key, starts
+        with its columns.
+
+        Returns:
+        list: The names of the created indexes.
+        """
+        self.cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        )
+        table_names = [row[0] for row in self.cursor.fetchall()]
+
+        created = []
+        for table_name in table_names:
+            self.cursor.execute(f"PRAGMA foreign_key_list({table_name})")
+            foreign_keys = {}
+            for foreign_key in self.cursor.fetchall():
+                foreign_keys.setdefault(foreign_key[0], []).append(foreign_key[3])
+            if not foreign_keys:
+                continue
+
+            indexed = [tuple(columns) for columns in self.list_indexes(table_name).values()]
+            # An INTEGER PRIMARY KEY is the rowid and has no separate index
+            self.cursor.execute(f"PRAGMA table_info({table_name})")
+            indexed.append(tuple(column[1] for column in sorted(
+                self.cursor.fetchall(), key=lambda column: column[5]) if column[5] > 0))
+            for columns in foreign_keys.values():
+                if not any(index[:len(columns)] == tuple(columns) for index in indexed):
+                    created.append(self.create_index(table_name, columns))
+        return created
 
     def add_column(self, table_name, column_name, data_type):
         """
@@ -168,6 +425,118 @@ class SQLite:
         except sqlite3.Error as err:
             print(f"An error occurred: {err}")
 
+    def create_spatial_index(self):
+        """
+        Creates numeric bbox columns and R*Tree indexes for Kreise and stations.
+
+        kreis_table gets xmin, ymin, xmax and ymax columns computed from the
+        geometry table (or the envelope string), mirrored into kreis_rtree.
+        Station coordinates are mirrored into stations_rtree. Triggers keep both
+        R*Trees in sync with later inserts, updates and deletes: the bbox
+        columns of new or changed Kreise are parsed from their envelope, which
+        every Kreis write path sets (see get_envelope).
+        """
+        if not self.table_exists("kreis_table") or not self.table_exists("stations"):
+            print("Tables kreis_table and stations must exist.")
+            return
+
+        try:
+            self.cursor.execute("PRAGMA table_info(kreis_table)")
+            kreis_columns = {column[1] for column in self.cursor.fetchall()}
+            for column in BBOX_COLUMNS:
+                if column not in kreis_columns:
+                    self.add_column("kreis_table", column, "REAL")
+            if "envelope" not in kreis_columns:
+                self.add_column("kreis_table", "envelope", "TEXT")
+
+            self.cursor.executescript(SPATIAL_INDEX_SCRIPT)
+
+            bboxes = {}
+            if "envelope" in kreis_columns:
+                self.cursor.execute(
+                    "SELECT KREISID, envelope FROM kreis_table WHERE envelope IS NOT NULL"
+                )
+                for kreis_id, envelope in self.cursor.fetchall():
+                    bboxes[kreis_id] = parse_envelope(envelope)
+            if self.table_exists("geometry"):
+                self.cursor.execute("SELECT KREISID, GeoData FROM geometry")
+                for kreis_id, geo_data in self.cursor.fetchall():
+                    bboxes[kreis_id] = geometry_bbox(geo_data)
+
+            # Filling the columns fires the triggers that maintain kreis_rtree
+            self.cursor.executemany(
+                "UPDATE kreis_table SET xmin = ?, ymin = ?, xmax = ?, ymax = ? WHERE KREISID = ?",
+                [(*bbox, kreis_id) for kreis_id, bbox in bboxes.items()]
+            )
+            self.cursor.execute(
+                'INSERT OR REPLACE INTO stations_rtree '
+                'SELECT OBJECTID, "Längengrad", "Längengrad", "Breitengrad", "Breitengrad" '
+                'FROM stations WHERE "Längengrad" IS NOT NULL AND "Breitengrad" IS NOT NULL'
+            )
+            self.conn.commit()
+            print("Spatial index created.")
+        except sqlite3.Error as err:
+            self.conn.rollback()
+            print(f"An error occurred: {err}")
+
+    def rebuild_kreis_stats(self):
+        """
+        Creates or rebuilds the kreis_stats aggregate table in one transaction.
+
+        kreis_stats holds the number of stations per Kreis, the KREIS_STATS_SOURCES
+        columns of kreis_table and the KREIS_METRICS ratios that can be computed
+        from them (ewz_sta, stations_per_pop, ev_per_station, ...). Triggers keep
+        it up to date with later inserts, updates and deletes, so this is only
+        needed once, after adding source columns to kreis_table, or after writes
+        from connections without recursive_triggers that used INSERT OR REPLACE.
+
+        Returns:
+        int: The number of rows in kreis_stats, or None on error.
+        """
+        if not self.table_exists("kreis_table") or not self.table_exists("stations"):
+            print("Tables kreis_table and stations must exist.")
+            return None
+
+        # The kreis_table insert trigger counts the stations of a new Kreis
+        if not any(columns[:1] == ["KREISID"]
+                   for columns in self.list_indexes("stations").values()):
+            self.create_index("stations", "KREISID")
+
+        try:
+            self.cursor.execute("PRAGMA table_info(kreis_table)")
+            kreis_columns = {column[1]: column[2] or "REAL" for column in self.cursor.fetchall()}
+            sources = {col: kreis_columns[col] for col in KREIS_STATS_SOURCES
+                       if col in kreis_columns}
+            available = ["stations", *sources]
+            ratios = KREIS_METRICS.sql_expressions(available, [
+                name for name in KREIS_METRICS.resolve(None, available)
+                if isinstance(KREIS_METRICS.definitions[name], Metric)
+            ])
+
+            source_list = "".join(f", k.{col}" for col in sources)
+            self.cursor.executescript(
+                "BEGIN;\n"
+                + "".join(f"DROP TRIGGER IF EXISTS {name};\n" for name in KREIS_STATS_TRIGGERS)
+                + f"DROP TABLE IF EXISTS {KREIS_STATS_TABLE};\n"
+                + kreis_stats_script(sources, ratios)
+                + f"INSERT INTO {KREIS_STATS_TABLE} (KREISID, stations"
+                + "".join(f", {col}" for col in sources) + ")\n"
+                + f"SELECT k.KREISID, COALESCE(c.stations, 0){source_list} FROM kreis_table AS k\n"
+                + "LEFT JOIN (SELECT KREISID, COUNT(*) AS stations FROM stations\n"
+                + "           GROUP BY KREISID) AS c ON c.KREISID = k.KREISID;\n"
+                + "COMMIT;"
+            )
+            self.cursor.execute(f"SELECT COUNT(*) FROM {KREIS_STATS_TABLE}")
+            count = self.cursor.fetchone()[0]
+            print(f"Table {KREIS_STATS_TABLE} rebuilt with {count} Kreise "
+                  f"and {len(ratios)} ratio(s).")
+            return count
+        except sqlite3.Error as err:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            print(f"An error occurred: {err}")
+            return None
+
     def check_and_filter_columns(self, table_name, data, strict):
         """
         Checks and filters columns based on their existence in the table schema.
@@ -345,20 +714,203 @@ class SQLite:
         except sqlite3.Error as error:
             print(f"An error occurred: {error}")
 
+    def fetch_existing_keys(self, table_name, key_column, key_values):
+        """
+        Returns the subset of key values that already exist in the table.
+
+        Parameters:
+        table_name (str): The name of the table.
+        key_column (str): The name of the key column.
+        key_values (list): The key values to look up.
+
+        Returns:
+        set: Key values already present in the table.
+        """
+        existing_keys = set()
+        for start in range(0, len(key_values), MAX_QUERY_PARAMS):
+            chunk = key_values[start:start + MAX_QUERY_PARAMS]
+            placeholders = ', '.join(['?' for _ in chunk])
+            self.cursor.execute(
+                f"SELECT {key_column} FROM {table_name} WHERE {key_column} IN ({placeholders})",
+                chunk
+            )
+            existing_keys.update(row[0] for row in self.cursor.fetchall())
+        return existing_keys
+
+    def fetch_reference_keys(self, reference_key, key_values):
+        """
+        Returns the subset of foreign key values present in the reference table.
+
+        Parameters:
+        reference_key (dict): Information about the foreign key reference.
+        key_values (list): The foreign key values to look up.
+
+        Returns:
+        set: Foreign key values that have a matching row in the reference table.
+        """
+        return self.fetch_existing_keys(
+            reference_key['table'], reference_key['reference_column'], key_values
+        )
+
+    def upsert_query(self, table_name, key_column, columns):
+        """
+        Creates an INSERT ... ON CONFLICT DO UPDATE query string.
+
+        Parameters:
+        table_name (str): The name of the table.
+        key_column (str): The name of the primary key column.
+        columns (tuple): The columns to insert.
+
+        Returns:
+        str: SQL query string.
+        """
+        column_list = ', '.join(columns)
+        placeholders = ', '.join(['?' for _ in columns])
+        update_pairs = ', '.join(
+            [f"{col} = excluded.{col}" for col in columns if col != key_column]
+        )
+        conflict_action = f"DO UPDATE SET {update_pairs}" if update_pairs else "DO NOTHING"
+        return (
+            f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders}) "
+            f"ON CONFLICT({key_column}) {conflict_action}"
+        )
+
+    def bulk_upsert(self, table_name, key_column, data,
+                    key_value=None, reference_key=None, strict=True, batch_size=1000):
+        """
+        Inserts or updates many rows using executemany and one commit per batch.
+
+        The table schema is read once, each batch is validated as a whole and
+        written with native INSERT ... ON CONFLICT DO UPDATE statements.
+
+        Parameters:
+        table_name (str): The name of the table.
+        key_column (str): The name of the primary key column. It must have a
+                          PRIMARY KEY or UNIQUE constraint, otherwise
+                          ON CONFLICT(key_column) fails and every row of the
+                          batch is reported as rejected.
+        data (Iterable[dict]): The rows to insert or update. Generators are
+                               consumed one batch at a time.
+        key_value (Optional[Any]): Key value applied to rows without a key column.
+        reference_key (Optional[dict]): Information about the foreign key reference.
+        strict (bool): If True, rows with unrecognized columns are rejected.
+        batch_size (int): Number of rows written per transaction, at least 1.
+
+        Returns:
+        dict: Counts of 'inserted', 'updated' and 'rejected' rows.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'rejected': 0}
+
+        if not isinstance(batch_size, int) or batch_size < 1:
+            print(f"An error occurred: batch_size must be a positive integer, not {batch_size!r}.")
+            counts['rejected'] = sum(1 for _ in data)
+            return counts
+
+        if not self.table_exists(table_name):
+            print(f"Table {table_name} does not exist.")
+            counts['rejected'] = sum(1 for _ in data)
+            return counts
+
+        self.cursor.execute(f"PRAGMA table_info({table_name})")
+        existing_columns = {column[1] for column in self.cursor.fetchall()}
+        ignored_columns = set()
+
+        rows_iter = iter(data)
+        while True:
+            batch = list(islice(rows_iter, batch_size))
+            if not batch:
+                break
+            valid_rows = []
+
+            for obj in batch:
+                row = dict(obj)
+                if key_value is not None and key_column not in row:
+                    row[key_column] = key_value
+
+                unrecognized_columns = row.keys() - existing_columns
+                if unrecognized_columns:
+                    if strict:
+                        counts['rejected'] += 1
+                        continue
+                    ignored_columns.update(unrecognized_columns)
+                    for col in unrecognized_columns:
+                        del row[col]
+
+                if row.get(key_column) is None:
+                    counts['rejected'] += 1
+                    continue
+                valid_rows.append(row)
+
+            if reference_key:
+                fk_column = reference_key['column']
+                fk_values = list({row[fk_column] for row in valid_rows
+                                  if row.get(fk_column) is not None})
+                valid_fks = self.fetch_reference_keys(reference_key, fk_values)
+                checked_rows = [row for row in valid_rows
+                                if row.get(fk_column) is None or row[fk_column] in valid_fks]
+                counts['rejected'] += len(valid_rows) - len(checked_rows)
+                valid_rows = checked_rows
+
+            try:
+                existing_keys = self.fetch_existing_keys(
+                    table_name, key_column, list({row[key_column] for row in valid_rows})
+                )
+
+                # Rows with the same column set share one prepared statement
+                grouped_rows = {}
+                inserted = 0
+                for row in valid_rows:
+                    grouped_rows.setdefault(tuple(row.keys()), []).append(row)
+                    if row[key_column] not in existing_keys:
+                        inserted += 1
+                        existing_keys.add(row[key_column])
+
+                for columns, rows in grouped_rows.items():
+                    self.cursor.executemany(
+                        self.upsert_query(table_name, key_column, columns),
+                        [tuple(row[col] for col in columns) for row in rows]
+                    )
+                self.conn.commit()
+
+                counts['inserted'] += inserted
+                counts['updated'] += len(valid_rows) - inserted
+
+            except sqlite3.Error as sql_error:
+                self.conn.rollback()
+                print(f"SQLite error occurred: {sql_error}")
+                counts['rejected'] += len(valid_rows)
+
+        for col in sorted(ignored_columns):
+            print(f"Ignoring unrecognized column: {col}")
+
+        print(f"Bulk upsert into table {table_name}: {counts['inserted']} inserted, "
+              f"{counts['updated']} updated, {counts['rejected']} rejected.")
+        return counts
+
     def insert_data(self, table_name, key_column, data,
-                    key_value=None, reference_key=None, strict=True):
+                    key_value=None, reference_key=None, strict=True,
+                    bulk=False, batch_size=1000):
         """
         Inserts data into a table. Can handle single or multiple rows.
 
         Parameters:
         table_name (str): The name of the table.
         key_column (str): The name of the primary key column.
-        data (Union[dict, list]): The data to be inserted.
+        data (Union[dict, list, Iterable[dict]]): The data to be inserted.
+                                                  Iterables require bulk mode.
         key_value (Optional[Any]): The value of the primary key.
         reference_key (Optional[dict]): The reference key details.
         strict (bool): If True, strict column matching is enforced.
+        bulk (bool): If True, lists and iterables are written with bulk_upsert.
+        batch_size (int): Number of rows per transaction in bulk mode.
+
+        Returns:
+        Optional[dict]: Inserted/updated/rejected counts in bulk mode, otherwise None.
         """
         try:
+            if bulk and not isinstance(data, dict):
+                return self.bulk_upsert(table_name, key_column, data, key_value,
+                                        reference_key, strict, batch_size)
             if isinstance(data, list):
                 for obj in data:
                     self.handle_data(table_name, key_column, obj, key_value, reference_key, strict)
@@ -367,3 +919,4 @@ class SQLite:
 
         except Exception as error:# pylint: disable=W0718
             print(f"An error occurred: {error}")
+        return None
@@ -0,0 +1,207 @@
+"""
+Module for ingesting Kreise in parallel shards that are merged into one database
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from data_handler.ingest_pipeline import IngestPipeline
+from data_handler.save_data import SQLite
+
+SHARD_TABLES = ["kreis_table", "geometry", "stations"]
+# SQLite attaches at most 10 databases by default (SQLITE_MAX_ATTACHED)
+MAX_SHARDS = 10
+
+def partition_kreise(kreise, shard_count):
+    """
+    Partitions Kreise by Bundesland (sn_l) into at most shard_count shards.
+
+    Bundesländer are kept whole and distributed greedily by size, largest first.
+
+    Parameters:
+    kreise (list): Kreis features with an 'sn_l' attribute.
+    shard_count (int): Maximum number of shards.
+
+    Returns:
+    list: Lists of Kreis features, one per non-empty shard.
+    """
+    by_land = {}
+    for kreis in kreise:
+        by_land.setdefault(kreis["attributes"].get("sn_l"), []).append(kreis)
+
+    shards = [[] for _ in range(min(shard_count, len(by_land)))]
+    for land in sorted(by_land.values(), key=len, reverse=True):
+        min(shards, key=len).extend(land)
+    return [shard for shard in shards if shard]
+
+def ingest_shard(shard_path, schema, kreise, pipeline_kwargs):
+    """
+    Process pool worker: creates the schema in a shard file and ingests into it.
+
+    Returns:
+    tuple: The shard path and the pipeline counts.
+    """
+    with SQLite(shard_path) as db_conn:
+        for create_table_query in schema:
+            db_conn.execute_create_table(create_table_query)
+    counts = IngestPipeline(shard_path, **pipeline_kwargs).run(kreise)
+    return shard_path, counts
+
+class ShardedIngest:
+    """
+    Ingests Kreise partitioned by Bundesland across a process pool.
+
+    Each worker runs an IngestPipeline into its own temporary SQLite file. The
+    shards are then merged into the target database with ATTACH and
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE inside a single transaction,
+    so readers never see a partially merged database.
+    """
+
+    def __init__(self, db_name, processes=None, **pipeline_kwargs):
+        """
+        Initializes the sharded ingest.
+
+        Parameters:
+        db_name (str): The target SQLite database. Its tables must exist.
+        processes (Optional[int]): Number of worker processes (at most 10).
+                                   Defaults to the number of CPUs.
+        pipeline_kwargs: Further arguments for each shard's IngestPipeline.
+                         A ResponseCache cannot be shared across processes.
+        """
+        self.db_name = db_name
+        self.processes = min(processes or os.cpu_count() or 1, MAX_SHARDS)
+        self.pipeline_kwargs = pipeline_kwargs
+
+    def read_schema(self):
+        """Returns the CREATE TABLE statements of the shard tables in the target."""
+        with SQLite(self.db_name) as db_conn:
+            placeholders = ", ".join(["?" for _ in SHARD_TABLES])
+            db_conn.cursor.execute(
+                f"SELECT name, sql FROM sqlite_master "
+                f"WHERE type='table' AND name IN ({placeholders})",
+                SHARD_TABLES
+            )
+            statements = dict(db_conn.cursor.fetchall())
+
+        missing = [name for name in SHARD_TABLES if name not in statements]
+        if missing:
+            raise ValueError(f"Table(s) {', '.join(missing)} do not exist in {self.db_name}.")
+        return [statements[name] for name in SHARD_TABLES]
+
+    @staticmethod
+    def merge_query(table_name, alias, columns, key_columns):
+        """
+        Creates the INSERT ... SELECT ... ON CONFLICT DO UPDATE query for one shard.
+
+        Existing rows are updated in place, so target columns the shard does not
+        have keep their values and no delete triggers fire. Without a primary key
+        the rows are simply inserted.
+        """
+        column_list = ", ".join(columns)
+        query = (f"INSERT INTO main.{table_name} ({column_list}) "
+                 f"SELECT {column_list} FROM {alias}.{table_name}")
+        if not key_columns:
+            return query
+
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns
+                            if col not in key_columns)
+        conflict_action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        # WHERE true keeps the parser from reading ON CONFLICT as a join constraint
+        return f"{query} WHERE true ON CONFLICT({', '.join(key_columns)}) {conflict_action}"
+
+    def merge(self, shard_paths):
+        """
+        Merges all shard files into the target database in one transaction.
+
+        Rows are upserted on each table's primary key over the columns the
+        target and the shard share.
+
+        Parameters:
+        shard_paths (list): Paths of the shard databases (at most 10).
+
+        Returns:
+        dict: Number of merged rows per table.
+        """
+        merged = {table_name: 0 for table_name in SHARD_TABLES}
+        with SQLite(self.db_name) as db_conn:
+            aliases = [f"shard{index}" for index in range(len(shard_paths))]
+            for alias, shard_path in zip(aliases, shard_paths):
+                db_conn.cursor.execute(f"ATTACH DATABASE ? AS {alias}", (shard_path,))
+
+            try:
+                db_conn.cursor.execute("BEGIN IMMEDIATE")
+                for table_name in SHARD_TABLES:
+                    db_conn.cursor.execute(f"PRAGMA main.table_info({table_name})")
+                    target_info = db_conn.cursor.fetchall()
+                    target_columns = [column[1] for column in target_info]
+                    key_columns = [column[1] for column in sorted(target_info,
+                                                                  key=lambda col: col[5])
+                                   if column[5] > 0]
+
+                    for alias in aliases:
+                        db_conn.cursor.execute(f"PRAGMA {alias}.table_info({table_name})")
+                        shard_columns = {column[1] for column in db_conn.cursor.fetchall()}
+                        columns = [col for col in target_columns if col in shard_columns]
+                        db_conn.cursor.execute(
+                            self.merge_query(table_name, alias, columns, key_columns)
+                        )
+                        merged[table_name] += db_conn.cursor.rowcount
+                db_conn.conn.commit()
+
+            except sqlite3.Error:
+                db_conn.conn.rollback()
+                raise
+
+            finally:
+                for alias in aliases:
+                    db_conn.cursor.execute(f"DETACH DATABASE {alias}")
+
+        return merged
+
+    def run(self, kreise):
+        """
+        Runs the sharded ingest.
+
+        Parameters:
+        kreise (list): Kreis features as returned by get_kreise(returnGeometry=True).
+
+        Returns:
+        Optional[dict]: Number of merged rows per table, or None on error.
+        """
+        try:
+            schema = self.read_schema()
+        except (sqlite3.Error, ValueError) as error:
+            print(f"An error occurred: {error}")
+            return None
+
+        shards = partition_kreise(list(kreise), self.processes)
+        shard_dir = tempfile.mkdtemp(prefix="chargeapp_shards_")
+        try:
+            shard_paths = [os.path.join(shard_dir, f"shard{index}.db")
+                           for index in range(len(shards))]
+            with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+                results = list(executor.map(
+                    ingest_shard, shard_paths, [schema] * len(shards), shards,
+                    [self.pipeline_kwargs] * len(shards)
+                ))
+
+            merged = self.merge([shard_path for shard_path, _ in results])
+            print("Merged shards: " + ", ".join(
+                f"{count} rows into {table_name}" for table_name, count in merged.items()
+            ) + ".")
+            return merged
+
+        except sqlite3.Error as error:
+            print(f"SQLite error occurred: {error}")
+            return None
+
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+def ingest_sharded(db_name, kreise, processes=None, **pipeline_kwargs):
+    """
+    Function for ingesting Kreise with a ShardedIngest
+    """
+    return ShardedIngest(db_name, processes, **pipeline_kwargs).run(kreise)
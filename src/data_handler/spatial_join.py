@@ -0,0 +1,118 @@
+"""
+Module for assigning stations to their Kreis in one spatial join
+"""
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from data_handler.fetch_data import SQLiteFetcher
+from data_handler.stations_find import polygon_geometry, stations_find
+
+UNMATCHED = -1
+
+class KreisJoiner:
+    """
+    Assigns points to Kreise using an STRtree over all Kreis polygons.
+
+    Every point gets exactly one KREISID: points on a shared border go to the
+    first matching Kreis, points outside all Kreise are reported as unmatched.
+    """
+
+    def __init__(self, geometry_rows):
+        """
+        Builds the index.
+
+        Parameters:
+        geometry_rows (list): Dicts with 'KREISID' and the ArcGIS 'geometry', as
+                              returned by SQLiteFetcher.fetch_geometry_data.
+        """
+        self.kreis_ids = np.array([row['KREISID'] for row in geometry_rows], dtype=np.int64)
+        self.geometries = np.array(
+            [polygon_geometry(row['geometry']) for row in geometry_rows], dtype=object
+        )
+        self.tree = STRtree(self.geometries)
+
+    @classmethod
+    def from_db(cls, db_name, table_name='geometry'):
+        """Builds the index from the geometry table of a database."""
+        with SQLiteFetcher(db_name) as fetcher:
+            return cls(fetcher.fetch_geometry_data(table_name))
+
+    def assign(self, longitudes, latitudes):
+        """
+        Finds the KREISID of each point in one vectorized pass.
+
+        Parameters:
+        longitudes (array-like): Longitudes of the points.
+        latitudes (array-like): Latitudes of the points.
+
+        Returns:
+        numpy.ndarray: KREISID per point, UNMATCHED (-1) if it lies in no Kreis.
+        """
+        points = shapely.points(
+            np.asarray(longitudes, dtype=float), np.asarray(latitudes, dtype=float)
+        )
+        point_idx, tree_idx = self.tree.query(points, predicate='intersects')
+
+        # Keep the first (lowest tree index) Kreis per point
+        order = np.lexsort((tree_idx, point_idx))
+        point_idx, tree_idx = point_idx[order], tree_idx[order]
+        first_point_idx, first = np.unique(point_idx, return_index=True)
+
+        result = np.full(len(points), UNMATCHED, dtype=np.int64)
+        result[first_point_idx] = self.kreis_ids[tree_idx[first]]
+        return result
+
+    def join(self, stations):
+        """
+        Sets 'KREISID' on each station dict.
+
+        Parameters:
+        stations (list): Station dicts with 'Längengrad' and 'Breitengrad'.
+
+        Returns:
+        tuple: (matched stations, report dict with 'matched', 'unmatched' counts
+               and the 'unmatched_ids' OBJECTIDs).
+        """
+        kreis_ids = self.assign(
+            [station.get('Längengrad') for station in stations],
+            [station.get('Breitengrad') for station in stations]
+        )
+
+        matched = []
+        unmatched_ids = []
+        for station, kreis_id in zip(stations, kreis_ids.tolist()):
+            if kreis_id == UNMATCHED:
+                unmatched_ids.append(station.get('OBJECTID'))
+            else:
+                station['KREISID'] = kreis_id
+                matched.append(station)
+
+        report = {
+            'matched': len(matched),
+            'unmatched': len(unmatched_ids),
+            'unmatched_ids': unmatched_ids
+        }
+        return matched, report
+
+def join_stations(db_name, stations=None, cache=None):
+    """
+    Assigns every station to a single KREISID.
+
+    Parameters:
+    db_name (str): Database holding the geometry table.
+    stations (Optional[list]): Stations to join. If None, the whole station layer
+                               is downloaded once with pagination.
+    cache (Optional[ResponseCache]): Cache for the station download.
+
+    Returns:
+    tuple: (matched stations, report dict), or (None, None) if the download failed.
+    """
+    if stations is None:
+        stations = stations_find(cache=cache, paginate=True)
+        if stations is None:
+            return None, None
+
+    matched, report = KreisJoiner.from_db(db_name).join(stations)
+    print(f"{report['matched']} station(s) matched, {report['unmatched']} unmatched.")
+    return matched, report
@@ -0,0 +1,121 @@
+"""
+Module for harvesting stations of many Kreise concurrently with asyncio
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import requests
+from requests.adapters import HTTPAdapter
+from data_handler.stations_find import STATIONS_URL, StationsFinder
+
+DEFAULT_CONCURRENCY = 8
+
+class AsyncStationsFinder:
+    """
+    Runs many envelope queries against the stations layer concurrently.
+
+    All requests share one requests.Session, so they reuse a pool of keep-alive
+    connections to the server. At most `concurrency` requests are in flight.
+    """
+    def __init__(self, base_url=STATIONS_URL, concurrency=DEFAULT_CONCURRENCY, cache=None):
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.finder = StationsFinder(base_url, session=self.session, cache=cache)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the worker threads and close the pooled connections.
+
+        Does not wait for requests still in flight, so closing on the event
+        loop thread (e.g. after an early break) never blocks the loop; queued
+        requests are cancelled and running ones are discarded.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    async def fetch_data(self, key, **kwargs):
+        """
+        Run one StationsFinder.fetch_data query without blocking the event loop.
+
+        Returns:
+        tuple: The given key and the list of stations (None on error).
+        """
+        loop = asyncio.get_running_loop()
+        stations = await loop.run_in_executor(
+            self.executor, partial(self.finder.fetch_data, **kwargs)
+        )
+        return key, stations
+
+    async def harvest(self, envelopes, **kwargs):
+        """
+        Query the stations inside many envelopes concurrently.
+
+        Results are yielded as soon as each query completes, not in input order.
+
+        Parameters:
+        envelopes (dict): Mapping of a key (e.g. KREISID) to an envelope string
+                          as returned by get_envelope.
+        kwargs: Additional parameters passed to StationsFinder.fetch_data.
+
+        Yields:
+        tuple: (key, stations) for each envelope.
+        """
+        tasks = [
+            asyncio.ensure_future(self.fetch_data(key, geometry=envelope, **kwargs))
+            for key, envelope in envelopes.items()
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+async def stations_harvest(envelopes, concurrency=DEFAULT_CONCURRENCY, cache=None, **kwargs):
+    """
+    Async generator yielding (key, stations) for each envelope as it completes.
+
+    Use with `async for` in a running event loop, e.g. inside a notebook.
+    """
+    with AsyncStationsFinder(concurrency=concurrency, cache=cache) as finder:
+        async for result in finder.harvest(envelopes, **kwargs):
+            yield result
+
+def stations_find_many(envelopes, concurrency=DEFAULT_CONCURRENCY, cache=None, **kwargs):
+    """
+    Blocking helper returning a dict of key to stations for all envelopes.
+
+    Inside a running event loop (e.g. a Jupyter notebook), where asyncio.run
+    is not allowed, the harvest runs on its own loop in a worker thread. Use
+    stations_harvest with `async for` to avoid blocking the notebook's loop.
+
+    Parameters:
+    envelopes (dict): Mapping of a key (e.g. KREISID) to an envelope string.
+    concurrency (int): Maximum number of concurrent requests.
+    cache (Optional[ResponseCache]): Cache to serve repeated queries from disk.
+
+    Returns:
+    dict: Mapping of each key to its list of stations (None on error).
+    """
+    async def collect():
+        return {key: stations
+                async for key, stations in stations_harvest(envelopes, concurrency,
+                                                            cache, **kwargs)}
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(collect())
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, collect()).result()
@@ -2,17 +2,29 @@
 Module for finding stations
 """
 
-import json
-import requests
+from functools import reduce
 from requests.exceptions import RequestException
-from shapely.geometry import Point, Polygon
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+from data_handler.arcgis_query import (
+    DEFAULT_MAX_WORKERS, DEFAULT_PAGE_SIZE, check_transfer_limit,
+    fetch_features_paginated, iter_features, iter_features_paginated, request_json
+)
+
+STATIONS_URL = (
+    'https://services2.arcgis.com/jUpNdisbWqRpMo35/arcgis/'
+    'rest/services/Ladesaeulen_in_Deutschland/FeatureServer/0/query'
+)
 
 class StationsFinder:
     """
     Class for station finding
     """
-    def __init__(self, base_url):
+    def __init__(self, base_url, session=None, cache=None):
         self.base_url = base_url
+        self.session = session
+        self.cache = cache
         self.default_params = {
             "where": "1=1",
             "objectIds": "",
@@ -53,9 +65,13 @@ class StationsFinder:
             'Public_Key4'
         ]
 
-    def fetch_data(self, object_ids=None, **kwargs):
+    def fetch_data(self, object_ids=None, paginate=False, page_size=DEFAULT_PAGE_SIZE,
+                   max_workers=DEFAULT_MAX_WORKERS, **kwargs):
         """
         Fetch data from API
+
+        With paginate=True all matching stations are downloaded in parallel pages,
+        so the result is not truncated by the server's maxRecordCount.
         """
         if object_ids:
             object_ids = ",".join(map(str, object_ids))
@@ -65,41 +81,133 @@ class StationsFinder:
         params.update(kwargs)
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=10.0)
-            response.raise_for_status()
+            if paginate:
+                features = fetch_features_paginated(
+                    self.base_url, params, page_size, max_workers,
+                    session=self.session, cache=self.cache
+                )
+                if features is None:
+                    return None
+            else:
+                data_json = request_json(self.base_url, params,
+                                         session=self.session, cache=self.cache)
+                if data_json is None:
+                    return None
+
+                check_transfer_limit(data_json)
+                features = data_json.get("features", [])
+
+            return self.format_features(features)
 
-            data_json = json.loads(response.text)
-            if "error" in data_json:
-                print(data_json)
-                return None
+        except RequestException as error:
+            print(f"An error occurred: {error}")
+            return None
 
-            features = data_json.get("features", [])
+    def iter_data(self, object_ids=None, paginate=False, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+        """
+        Stream stations from API one at a time
 
-            formatted_data = [
-                {
-                    **feature.get("attributes", {}),
-                    "geometry": feature.get("geometry", {})
-                }
-                for feature in features
-            ]
+        The response is decoded incrementally and attributes and geometry are
+        merged per station as it is consumed, so memory use stays constant.
+        Errors are printed and end the stream.
+        """
+        if object_ids:
+            object_ids = ",".join(map(str, object_ids))
 
-            return formatted_data
+        params = self.default_params.copy()
+        params['objectIds'] = object_ids
+        params.update(kwargs)
+
+        try:
+            if paginate:
+                features = iter_features_paginated(
+                    self.base_url, params, page_size, session=self.session
+                )
+            else:
+                features = iter_features(self.base_url, params, session=self.session)
+
+            for feature in features:
+                yield self.format_feature(feature)
 
         except RequestException as error:
             print(f"An error occurred: {error}")
-            return None
 
-def stations_find(object_ids=None, **kwargs):
+    @staticmethod
+    def format_feature(feature):
+        """
+        Merge the attributes and geometry of a feature into one dict
+        """
+        return {
+            **feature.get("attributes", {}),
+            "geometry": feature.get("geometry", {})
+        }
+
+    @staticmethod
+    def format_features(features):
+        """
+        Merge the attributes and geometry of each feature into one dict
+        """
+        return [StationsFinder.format_feature(feature) for feature in features]
+
+def stations_find(object_ids=None, cache=None, **kwargs):
     """
     Function for retrieving stations
+
+    An optional ResponseCache serves repeated queries from disk.
     """
-    base_url = (
-    'https://services2.arcgis.com/jUpNdisbWqRpMo35/arcgis/'
-    'rest/services/Ladesaeulen_in_Deutschland/FeatureServer/0/query'
-)
-    api= StationsFinder(base_url)
+    api= StationsFinder(STATIONS_URL, cache=cache)
     return api.fetch_data(object_ids, **kwargs)
 
+def stations_stream(object_ids=None, **kwargs):
+    """
+    Function for streaming stations one at a time
+    """
+    api= StationsFinder(STATIONS_URL)
+    return api.iter_data(object_ids, **kwargs)
+
+def polygon_geometry(polygon):
+    """
+    Builds a prepared shapely geometry from all rings of an ArcGIS polygon.
+
+    The rings are combined with the even-odd rule (symmetric difference), so
+    holes cut out of their outer ring and additional parts such as islands or
+    exclaves are kept. Each ring is made valid first, so self-intersecting or
+    self-touching rings do not break the overlay.
+
+    Parameters:
+    polygon (dict): Dictionary containing the polygon 'rings'.
+
+    Returns:
+    shapely.Geometry: The prepared (Multi)Polygon.
+    """
+    rings = shapely.make_valid(
+        np.array([Polygon(ring) for ring in polygon['rings'] if len(ring) >= 4], dtype=object)
+    )
+    # make_valid may return collections with collapsed lines; keep the polygons
+    parts = shapely.get_parts(rings)
+    parts = parts[shapely.get_type_id(parts) == shapely.GeometryType.POLYGON]
+    geometry = shapely.make_valid(reduce(shapely.symmetric_difference, parts, Polygon()))
+    shapely.prepare(geometry)
+    return geometry
+
+def stations_mask(polygon, longitudes, latitudes):
+    """
+    Tests a batch of coordinates against a polygon in one vectorized call.
+
+    Parameters:
+    polygon (Union[dict, shapely.Geometry]): ArcGIS polygon or a geometry
+                                              from polygon_geometry.
+    longitudes (array-like): Longitudes of the points.
+    latitudes (array-like): Latitudes of the points.
+
+    Returns:
+    numpy.ndarray: Boolean mask, True where the point lies within the polygon.
+    """
+    geometry = polygon_geometry(polygon) if isinstance(polygon, dict) else polygon
+    longitudes = np.asarray(longitudes, dtype=float)
+    latitudes = np.asarray(latitudes, dtype=float)
+    return shapely.contains_xy(geometry, longitudes, latitudes)
+
 def filter_stations(polygon, data_list):
     """
     Filters a list of dictionaries to keep all keys and
@@ -107,28 +215,21 @@ def filter_stations(polygon, data_list):
     
     Parameters:
     data_list (list): The original list of dictionaries.
-    polygon (dict): Dictionary containing the polygon coordinates.
+    polygon (Union[dict, shapely.Geometry]): Dictionary containing the polygon
+                                              coordinates, or a prepared geometry.
     
     Returns:
     list: A new list of filtered dictionaries.
     """
-    # Create a Shapely Polygon object from the 'rings' coordinates
-    poly = Polygon(polygon['rings'][0])
-
-    # Initialize an empty list to store the filtered dictionaries
-    filtered_list = []
-
-    # Loop through the original data list
-    for entry in data_list:
-        # Create a Point object from the coordinates
-        point = Point(entry['Längengrad'], entry['Breitengrad'])
+    if not data_list:
+        return []
 
-        # Check if the point is within the polygon
-        if point.within(poly):
-            # Since we are keeping all keys, we can directly append the original entry
-            filtered_list.append(entry)
+    # Missing coordinates become NaN and never match
+    longitudes = [entry.get('Längengrad') for entry in data_list]
+    latitudes = [entry.get('Breitengrad') for entry in data_list]
+    mask = stations_mask(polygon, longitudes, latitudes)
 
-    return filtered_list
+    return [entry for entry, inside in zip(data_list, mask) if inside]
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,216 @@
+"""
+Module for incrementally syncing the stations table with the ArcGIS layer
+"""
+
+import json
+from datetime import datetime, timezone
+from requests.exceptions import RequestException
+from data_handler.arcgis_query import fetch_features_paginated, fetch_object_ids
+from data_handler.geometry_codec import load_geometry
+from data_handler.save_data import SQLite, MAX_QUERY_PARAMS
+from data_handler.spatial_join import KreisJoiner
+from data_handler.stations_find import STATIONS_URL, StationsFinder
+
+METADATA_TABLE = "sync_metadata"
+MAX_ID_KEY = "stations_max_objectid"
+WATERMARK_KEY = "stations_watermark"
+SYNCED_AT_KEY = "stations_synced_at"
+UNMATCHED_KEY = "stations_unmatched_ids"
+
+class StationsSync:
+    """
+    Applies only the changes of the stations layer to the local stations table.
+
+    New stations are those with an OBJECTID above the stored maximum or an
+    Inbetriebnahmedatum newer than the last watermark; deleted stations are found
+    by diffing the remote and local OBJECTID lists. The watermark is kept in the
+    sync_metadata table, together with the OBJECTIDs of stations outside of
+    every Kreis, which are not requested again as missing. Delete that entry to
+    retry them, e.g. after adding Kreis geometries.
+    """
+
+    def __init__(self, db_name, base_url=STATIONS_URL, cache=None):
+        """
+        Initializes the sync.
+
+        Parameters:
+        db_name (str): The name of the SQLite database.
+        base_url (str): Query URL of the stations layer.
+        cache (Optional[ResponseCache]): Cache for the ArcGIS requests. Use a
+                                         short TTL, otherwise the sync sees old data.
+        """
+        self.db_name = db_name
+        self.finder = StationsFinder(base_url, cache=cache)
+
+    @staticmethod
+    def create_metadata_table(db_conn):
+        """Creates the key/value sync_metadata table if it does not exist."""
+        db_conn.execute_create_table(
+            f"CREATE TABLE IF NOT EXISTS {METADATA_TABLE} "
+            "(name TEXT PRIMARY KEY NOT NULL, value TEXT);"
+        )
+
+    @staticmethod
+    def read_metadata(db_conn, name):
+        """Returns a stored metadata value, or None."""
+        db_conn.cursor.execute(f"SELECT value FROM {METADATA_TABLE} WHERE name = ?", (name,))
+        row = db_conn.cursor.fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    @staticmethod
+    def write_metadata(db_conn, values):
+        """Stores metadata values (dict of name to JSON-serializable value)."""
+        db_conn.cursor.executemany(
+            f"INSERT INTO {METADATA_TABLE} (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            [(name, json.dumps(value)) for name, value in values.items()]
+        )
+        db_conn.conn.commit()
+
+    @staticmethod
+    def watermark_clause(watermark):
+        """
+        Builds the where clause selecting stations commissioned after the watermark.
+
+        Date fields come back from ArcGIS as epoch milliseconds; text values
+        are compared as strings.
+        """
+        if isinstance(watermark, (int, float)):
+            timestamp = datetime.fromtimestamp(watermark / 1000, tz=timezone.utc)
+            return f"Inbetriebnahmedatum > timestamp '{timestamp:%Y-%m-%d %H:%M:%S}'"
+        escaped = str(watermark).replace("'", "''")
+        return f"Inbetriebnahmedatum > '{escaped}'"
+
+    @staticmethod
+    def assign_kreisid(db_conn, stations):
+        """
+        Sets KREISID on each station from the polygons in the geometry table.
+
+        Stations outside of all polygons are dropped and reported.
+
+        Returns:
+        tuple: (assigned stations, set of the OBJECTIDs of dropped stations).
+        """
+        if not stations:
+            return [], set()
+        db_conn.cursor.execute("SELECT KREISID, GeoData FROM geometry")
+        geometry_rows = [{"KREISID": row[0], "geometry": load_geometry(row[1])}
+                         for row in db_conn.cursor.fetchall()]
+
+        assigned, report = KreisJoiner(geometry_rows).join(stations)
+        if report['unmatched']:
+            print(f"{report['unmatched']} station(s) lie outside of every Kreis and were skipped.")
+        assigned_ids = {station.get("OBJECTID") for station in assigned}
+        unmatched_ids = {station.get("OBJECTID") for station in stations} - assigned_ids
+        return assigned, unmatched_ids
+
+    def fetch_changes(self, max_id, watermark, missing_ids):
+        """
+        Downloads new or re-dated stations and stations missing locally.
+
+        Returns:
+        Optional[list]: Formatted stations, or None on error.
+        """
+        params = self.finder.default_params.copy()
+        clauses = [f"OBJECTID > {int(max_id)}"] if max_id is not None else ["1=1"]
+        if watermark is not None:
+            clauses.append(self.watermark_clause(watermark))
+        params['where'] = " OR ".join(f"({clause})" for clause in clauses)
+
+        features = fetch_features_paginated(
+            self.finder.base_url, params, cache=self.finder.cache
+        )
+        if features is None:
+            return None
+
+        fetched_ids = {feature.get("attributes", {}).get("OBJECTID") for feature in features}
+        missing_ids = sorted(set(missing_ids) - fetched_ids)
+        for start in range(0, len(missing_ids), MAX_QUERY_PARAMS):
+            missing_params = self.finder.default_params.copy()
+            missing_params['objectIds'] = ",".join(
+                map(str, missing_ids[start:start + MAX_QUERY_PARAMS])
+            )
+            missing = fetch_features_paginated(
+                self.finder.base_url, missing_params, cache=self.finder.cache
+            )
+            if missing is None:
+                return None
+            features.extend(missing)
+
+        return self.finder.format_features(features)
+
+    def run(self):
+        """
+        Runs one incremental sync.
+
+        Returns:
+        Optional[dict]: Counts of 'inserted', 'updated', 'rejected' and 'deleted'
+                        stations, or None if the remote layer could not be read.
+        """
+        with SQLite(self.db_name) as db_conn:
+            if not db_conn.table_exists("stations"):
+                print("Table stations does not exist.")
+                return None
+            self.create_metadata_table(db_conn)
+
+            db_conn.cursor.execute("SELECT OBJECTID FROM stations")
+            local_ids = {row[0] for row in db_conn.cursor.fetchall()}
+
+            max_id = self.read_metadata(db_conn, MAX_ID_KEY)
+            if max_id is None and local_ids:
+                max_id = max(local_ids)
+            watermark = self.read_metadata(db_conn, WATERMARK_KEY)
+            unmatched_ids = set(self.read_metadata(db_conn, UNMATCHED_KEY) or [])
+
+            try:
+                remote_ids = fetch_object_ids(
+                    self.finder.base_url, self.finder.default_params, cache=self.finder.cache
+                )
+                if remote_ids is None:
+                    return None
+                remote_ids = set(remote_ids)
+
+                stations = self.fetch_changes(
+                    max_id, watermark, remote_ids - local_ids - unmatched_ids
+                )
+                if stations is None:
+                    return None
+            except RequestException as error:
+                print(f"An error occurred: {error}")
+                return None
+
+            deleted_ids = sorted(local_ids - remote_ids)
+            db_conn.cursor.executemany(
+                "DELETE FROM stations WHERE OBJECTID = ?", [(key,) for key in deleted_ids]
+            )
+            db_conn.conn.commit()
+
+            fetched_ids = {station.get("OBJECTID") for station in stations}
+            stations, new_unmatched_ids = self.assign_kreisid(db_conn, stations)
+            unmatched_ids = ((unmatched_ids - fetched_ids) | new_unmatched_ids) & remote_ids
+            counts = db_conn.insert_data("stations", "OBJECTID", stations,
+                                         strict=False, bulk=True)
+            if counts is None:
+                counts = {'inserted': 0, 'updated': 0, 'rejected': len(stations)}
+            counts['deleted'] = len(deleted_ids)
+
+            dates = [station['Inbetriebnahmedatum'] for station in stations
+                     if station.get('Inbetriebnahmedatum') is not None]
+            if watermark is not None:
+                dates.append(watermark)
+            self.write_metadata(db_conn, {
+                MAX_ID_KEY: max(remote_ids) if remote_ids else max_id,
+                WATERMARK_KEY: max(dates) if dates else None,
+                SYNCED_AT_KEY: datetime.now(timezone.utc).isoformat(),
+                UNMATCHED_KEY: sorted(unmatched_ids),
+            })
+
+        print(f"Stations synced: {counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['deleted']} deleted, {counts['rejected']} rejected.")
+        return counts
+
+def sync_stations(db_name, cache=None):
+    """
+    Function for incrementally syncing the stations table
+    """
+    return StationsSync(db_name, cache=cache).run()
@@ -0,0 +1,297 @@
+"""
+Module for exporting Kreis geometries as TopoJSON with shared borders and loading it back.
+
+Coordinates are quantized to an integer grid first, so the borders of
+neighbouring Kreise match exactly. Every ring is then cut at its junctions
+(points where the neighbouring points differ between rings) into arcs, and
+each arc is stored once and referenced by both Kreise, reversed (~index)
+where needed. Arcs are delta-encoded as in the TopoJSON specification.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely.geometry.polygon import orient
+from data_handler.fetch_data import SQLiteFetcher
+from data_handler.stations_find import polygon_geometry
+
+DEFAULT_QUANTIZATION = 100000
+DEFAULT_OBJECT_NAME = "kreise"
+PROPERTY_COLUMNS = ['KREISID', 'ags', 'gen', 'bez', 'ewz', 'nuts', 'stations']
+
+Point = Tuple[int, int]
+
+def polygon_parts(geometry: Any) -> List[List[np.ndarray]]:
+    """Return the rings of each polygon, exterior clockwise and holes counter-clockwise."""
+    parts = []
+    for polygon in shapely.get_parts(geometry):
+        if polygon.is_empty or polygon.geom_type != "Polygon":
+            continue
+        polygon = orient(polygon, sign=-1.0)
+        parts.append([shapely.get_coordinates(polygon.exterior)] +
+                     [shapely.get_coordinates(ring) for ring in polygon.interiors])
+    return parts
+
+class TopologyBuilder:
+    """Builds a quantized, delta-encoded TopoJSON topology from polygons."""
+
+    def __init__(self, bbox: Tuple[float, float, float, float],
+                 quantization: int = DEFAULT_QUANTIZATION):
+        """
+        Initialize the builder.
+
+        Parameters:
+            bbox (Tuple[float, float, float, float]): (xmin, ymin, xmax, ymax) of all input.
+            quantization (int): Number of grid steps per axis.
+        """
+        xmin, ymin, xmax, ymax = bbox
+        self.translate = [xmin, ymin]
+        self.scale = [
+            (xmax - xmin) / (quantization - 1) if xmax > xmin else 1.0,
+            (ymax - ymin) / (quantization - 1) if ymax > ymin else 1.0,
+        ]
+        self.arcs = []
+        self.arc_index = {}
+
+    def quantize(self, ring: np.ndarray) -> List[Point]:
+        """Snap a ring to the grid and drop consecutive duplicate points."""
+        grid = np.round((ring - self.translate) / self.scale).astype(np.int64)
+        keep = np.ones(len(grid), dtype=bool)
+        keep[1:] = np.any(grid[1:] != grid[:-1], axis=1)
+        return [tuple(point) for point in grid[keep].tolist()]
+
+    @staticmethod
+    def find_junctions(rings: Iterable[List[Point]]) -> set:
+        """
+        Return the points where rings meet or diverge.
+
+        A point is a junction if it is seen with different neighbour pairs,
+        i.e. where a shared border starts or ends.
+        """
+        neighbours = {}
+        junctions = set()
+        for ring in rings:
+            points = ring[:-1]
+            count = len(points)
+            for index, point in enumerate(points):
+                previous, following = points[index - 1], points[(index + 1) % count]
+                pair = (previous, following) if previous <= following else (following, previous)
+                seen = neighbours.setdefault(point, pair)
+                if seen != pair:
+                    junctions.add(point)
+        return junctions
+
+    def add_arc(self, points: List[Point]) -> int:
+        """Store an arc once and return its index, or ~index if stored reversed."""
+        key = tuple(points)
+        if key in self.arc_index:
+            return self.arc_index[key]
+        reverse_key = key[::-1]
+        if reverse_key in self.arc_index:
+            return ~self.arc_index[reverse_key]
+        index = len(self.arcs)
+        self.arc_index[key] = index
+        self.arcs.append(points)
+        return index
+
+    def ring_arcs(self, ring: List[Point], junctions: set) -> List[int]:
+        """Cut a closed ring at its junctions and return the arc indexes."""
+        points = ring[:-1]
+        cuts = [index for index, point in enumerate(points) if point in junctions]
+        if not cuts:
+            # A ring without junctions is one arc; start at its smallest point
+            # so the same ring in two Kreise (e.g. an enclave) is shared
+            start = points.index(min(points))
+            points = points[start:] + points[:start]
+            return [self.add_arc(points + [points[0]])]
+
+        points = points[cuts[0]:] + points[:cuts[0]]
+        cuts = [index - cuts[0] for index in cuts] + [len(points)]
+        points = points + [points[0]]
+        return [self.add_arc(points[start:end + 1]) for start, end in zip(cuts[:-1], cuts[1:])]
+
+    def encoded_arcs(self) -> List[List[List[int]]]:
+        """Return the arcs delta-encoded: first point absolute, then differences."""
+        encoded = []
+        for arc in self.arcs:
+            points = np.array(arc, dtype=np.int64)
+            points[1:] = np.diff(points, axis=0)
+            encoded.append(points.tolist())
+        return encoded
+
+    def build(self, features: List[Tuple[Any, List[List[np.ndarray]], Dict[str, Any]]],
+              object_name: str = DEFAULT_OBJECT_NAME) -> Dict[str, Any]:
+        """
+        Build the topology.
+
+        Parameters:
+            features (list): (id, polygon parts from polygon_parts, properties).
+            object_name (str): Name of the GeometryCollection object.
+
+        Returns:
+            Dict[str, Any]: The TopoJSON topology.
+        """
+        quantized = [
+            (feature_id, [[self.quantize(ring) for ring in part] for part in parts], properties)
+            for feature_id, parts, properties in features
+        ]
+        # Rings that collapse to fewer than 4 grid points are dropped
+        quantized = [
+            (feature_id, [[ring for ring in part if len(ring) >= 4] for part in parts], properties)
+            for feature_id, parts, properties in quantized
+        ]
+        junctions = self.find_junctions(
+            ring for _, parts, _ in quantized for part in parts for ring in part
+        )
+
+        geometries = []
+        for feature_id, parts, properties in quantized:
+            polygons = [[self.ring_arcs(ring, junctions) for ring in part]
+                        for part in parts if part]
+            geometry = {"id": feature_id, "properties": properties}
+            if len(polygons) == 1:
+                geometry.update({"type": "Polygon", "arcs": polygons[0]})
+            elif polygons:
+                geometry.update({"type": "MultiPolygon", "arcs": polygons})
+            else:
+                geometry["type"] = None
+            geometries.append(geometry)
+
+        return {
+            "type": "Topology",
+            "transform": {"scale": self.scale, "translate": self.translate},
+            "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+            "arcs": self.encoded_arcs(),
+        }
+
+def build_topology(db_name: str, level: int = 0,
+                   quantization: int = DEFAULT_QUANTIZATION,
+                   columns: Optional[List[str]] = None,
+                   kreisid: Optional[List[Any]] = None,
+                   object_name: str = DEFAULT_OBJECT_NAME) -> Dict[str, Any]:
+    """
+    Build a TopoJSON topology of the Kreise in a database.
+
+    Parameters:
+        db_name (str): The SQLite database with the geometry and kreis_table tables.
+        level (int): Level of detail, see SQLiteFetcher.fetch_geometry_data.
+        quantization (int): Number of grid steps per axis.
+        columns (List[str], optional): kreis_table columns to include as
+            properties. Defaults to PROPERTY_COLUMNS.
+        kreisid (List[Any], optional): Restrict the export to these Kreise.
+        object_name (str): Name of the GeometryCollection object.
+
+    Returns:
+        Dict[str, Any]: The TopoJSON topology.
+    """
+    columns = columns or PROPERTY_COLUMNS
+    with SQLiteFetcher(db_name, kreisid=kreisid) as fetcher:
+        geometries = fetcher.fetch_geometry_data(level=level)
+        kreise = {kreis['KREISID']: kreis for kreis in fetcher.fetch_kreis_stats()} \
+            if fetcher.table_exists('kreis_table') else {}
+
+    features = []
+    for row in geometries:
+        kreis = kreise.get(row['KREISID'], {})
+        properties = {key: kreis[key] for key in columns if key in kreis}
+        features.append((row['KREISID'], polygon_parts(polygon_geometry(row['geometry'])),
+                         properties))
+
+    coords = [ring for _, parts, _ in features for part in parts for ring in part]
+    if coords:
+        stacked = np.concatenate(coords)
+        bbox = (*stacked.min(axis=0).tolist(), *stacked.max(axis=0).tolist())
+    else:
+        bbox = (0.0, 0.0, 0.0, 0.0)
+    return TopologyBuilder(bbox, quantization).build(features, object_name)
+
+def export_topojson(db_name: str, target: Any = None, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Export the Kreise of a database as TopoJSON.
+
+    Parameters:
+        db_name (str): The SQLite database.
+        target (Any, optional): A path or text file object to write the compact
+            JSON to.
+        **kwargs: Further arguments for build_topology.
+
+    Returns:
+        Dict[str, Any]: The TopoJSON topology.
+    """
+    topology = build_topology(db_name, **kwargs)
+    if target is not None:
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, "w", encoding="utf-8") as file:
+                json.dump(topology, file, separators=(",", ":"), ensure_ascii=False)
+        else:
+            json.dump(topology, target, separators=(",", ":"), ensure_ascii=False)
+
+    arc_points = sum(len(arc) for arc in topology["arcs"])
+    print(f"TopoJSON with {len(topology['arcs'])} arcs and {arc_points} points exported.")
+    return topology
+
+def decode_arcs(topology: Dict[str, Any]) -> List[np.ndarray]:
+    """Undo the delta encoding and quantization of all arcs."""
+    transform = topology.get("transform")
+    arcs = []
+    for arc in topology["arcs"]:
+        points = np.array(arc, dtype=np.float64).reshape(-1, 2)
+        if transform:
+            points = np.cumsum(points, axis=0) * transform["scale"] + transform["translate"]
+        arcs.append(points)
+    return arcs
+
+def arcs_to_ring(indexes: List[int], arcs: List[np.ndarray]) -> List[List[float]]:
+    """Join the referenced arcs to one ring, dropping the shared end points."""
+    ring = []
+    for position, index in enumerate(indexes):
+        points = arcs[~index][::-1] if index < 0 else arcs[index]
+        ring.extend((points if position == 0 else points[1:]).tolist())
+    return ring
+
+def load_topojson(source: Any, object_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load a TopoJSON topology as a GeoJSON FeatureCollection.
+
+    Parameters:
+        source (Any): A topology dict, a path or a text file object.
+        object_name (str, optional): The object to load. Defaults to the first.
+
+    Returns:
+        Dict[str, Any]: The FeatureCollection, e.g. for import_geojson.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8") as file:
+            topology = json.load(file)
+    elif isinstance(source, dict):
+        topology = source
+    else:
+        topology = json.load(source)
+
+    arcs = decode_arcs(topology)
+    objects = topology["objects"]
+    collection = objects[object_name or next(iter(objects))]
+
+    features = []
+    for geometry in collection.get("geometries", []):
+        if geometry.get("type") == "Polygon":
+            coordinates = [arcs_to_ring(ring, arcs) for ring in geometry["arcs"]]
+        elif geometry.get("type") == "MultiPolygon":
+            coordinates = [[arcs_to_ring(ring, arcs) for ring in polygon]
+                           for polygon in geometry["arcs"]]
+        else:
+            coordinates = None
+
+        feature = {
+            "type": "Feature",
+            "properties": geometry.get("properties", {}),
+            "geometry": {"type": geometry["type"], "coordinates": coordinates}
+                        if coordinates is not None else None,
+        }
+        if "id" in geometry:
+            feature["id"] = geometry["id"]
+        features.append(feature)
+
+    return {"type": "FeatureCollection", "features": features}
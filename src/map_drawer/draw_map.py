@@ -6,6 +6,7 @@ This class provides functionalities for plotting regions, envelopes, and station
 import plotly.graph_objects as go
 import numpy as np
 from kreis_loader import get_kreise  # Assuming kreis_loader is another Python file you have
+from data_handler.kreis_find import parse_envelope
 
 class DrawMap:
     """Draw geographical regions on a map."""
@@ -128,15 +129,18 @@ class DrawMap:
         Adds a rectangle to the map.
 
         Parameters:
-        envelope (str): Coordinates defining the rectangle as a string.
+        envelope (Union[str, Sequence[float]]): Coordinates defining the rectangle,
+        either as an envelope string or as (xmin, ymin, xmax, ymax).
 
         Returns:
         object: Updated Plotly Figure object.
         """
         try:
-            clean_str = envelope.strip("{}")
-            str_values = clean_str.split(", ")
-            envelope = [float(x) for x in str_values]
+            if isinstance(envelope, str):
+                envelope = parse_envelope(envelope)
+            envelope = [float(x) for x in envelope]
+            if len(envelope) != 4:
+                raise ValueError
         except (ValueError, TypeError):
             print("Invalid envelope format. Expected a string with comma-separated float values.")
             return self.fig
@@ -158,15 +162,20 @@ class DrawMap:
         Adds points (flags) to the map.
 
         Parameters:
-        stations (list):
-        List of dictionaries containing 'Breitengrad' (latitude) and 'Längengrad' (longitude) keys.
+        stations (Union[list, dict, DataFrame]):
+        List of dictionaries containing 'Breitengrad' (latitude) and 'Längengrad' (longitude) keys,
+        or columns with these names as returned by SQLiteFetcher.fetch_columns/fetch_dataframe.
 
         Returns:
         object: Updated Plotly Figure object.
         """
         try:
-            latitudes = [entry['Breitengrad'] for entry in stations]
-            longitudes = [entry['Längengrad'] for entry in stations]
+            if isinstance(stations, list):
+                latitudes = [entry['Breitengrad'] for entry in stations]
+                longitudes = [entry['Längengrad'] for entry in stations]
+            else:
+                latitudes = np.asarray(stations['Breitengrad'])
+                longitudes = np.asarray(stations['Längengrad'])
         except (KeyError, TypeError):
             print("Invalid format. Expected a list of dicts with 'Breitengrad'/'Längengrad'.")
             return self.fig
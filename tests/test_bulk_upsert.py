@@ -0,0 +1,62 @@
+"""Tests for SQLite.bulk_upsert."""
+
+import os
+import tempfile
+import unittest
+from data_handler import SQLite
+
+REFERENCE_KEY = {"table": "kreis_table", "column": "KREISID", "reference_column": "KREISID"}
+
+class BulkUpsertTest(unittest.TestCase):
+    """Rows are inserted, updated or rejected batch by batch."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.db = SQLite(self.db_name).__enter__()
+        self.db.create_table("kreis_table", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                             "gen": "TEXT"})
+        self.db.create_sub_table("stations", {"OBJECTID": "INTEGER PRIMARY KEY NOT NULL",
+                                              "KREISID": "INTEGER", "Betreiber": "TEXT"},
+                                 dict(REFERENCE_KEY))
+        self.db.bulk_upsert("kreis_table", "KREISID", [{"KREISID": 1, "gen": "Köln"}])
+
+    def tearDown(self):
+        self.db.__exit__(None, None, None)
+        os.remove(self.db_name)
+
+    def stations(self):
+        self.db.cursor.execute("SELECT OBJECTID, KREISID, Betreiber FROM stations "
+                               "ORDER BY OBJECTID")
+        return self.db.cursor.fetchall()
+
+    def test_insert_update_and_reject(self):
+        rows = ({"OBJECTID": object_id, "Betreiber": f"B{object_id}"} for object_id in range(5))
+        counts = self.db.bulk_upsert("stations", "OBJECTID", rows,
+                                     reference_key=REFERENCE_KEY, batch_size=2)
+        # Without KREISID the foreign key is not checked
+        self.assertEqual(counts, {"inserted": 5, "updated": 0, "rejected": 0})
+
+        counts = self.db.bulk_upsert("stations", "OBJECTID", [
+            {"OBJECTID": 0, "KREISID": 1, "Betreiber": "Neu"},   # updated
+            {"OBJECTID": 5, "KREISID": 1},                       # inserted
+            {"OBJECTID": 6, "KREISID": 99},                      # unknown Kreis
+            {"OBJECTID": 7, "Unbekannt": 1},                     # unknown column
+            {"Betreiber": "ohne Schlüssel"},                     # no key
+        ], reference_key=REFERENCE_KEY, batch_size=2)
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "rejected": 3})
+        self.assertEqual(self.stations()[0], (0, 1, "Neu"))
+        self.assertEqual(self.stations()[-1], (5, 1, None))
+
+    def test_lenient_and_invalid_batch_size(self):
+        counts = self.db.bulk_upsert("stations", "OBJECTID", [{"OBJECTID": 1, "Unbekannt": 1}],
+                                     strict=False)
+        self.assertEqual(counts["inserted"], 1)
+        for batch_size in (0, -1, 2.5, None):
+            counts = self.db.bulk_upsert("stations", "OBJECTID", [{"OBJECTID": 2}],
+                                         batch_size=batch_size)
+            self.assertEqual(counts, {"inserted": 0, "updated": 0, "rejected": 1})
+        self.assertEqual(len(self.stations()), 1)
+
+if __name__ == "__main__":
+    unittest.main()
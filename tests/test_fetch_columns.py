@@ -0,0 +1,55 @@
+"""Tests for the columnar fetch mode of SQLiteFetcher."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from data_handler import SQLiteFetcher
+
+class FetchColumnsTest(unittest.TestCase):
+    """The array dtypes follow the stored values, not the declared column types."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            conn.execute("CREATE TABLE stations (ID INTEGER PRIMARY KEY, KREISID INTEGER, "
+                         "P1__kW_ INTEGER, Postleitzahl INTEGER, Nennleistung REAL)")
+            conn.executemany("INSERT INTO stations VALUES (?, ?, ?, ?, ?)", [
+                (1, 5, 22, 50667, 22.0),
+                (2, 5, 3.7, "D-123", None),
+                (3, 6, None, 50667, 11.0),
+            ])
+        conn.close()
+
+    def tearDown(self):
+        os.remove(self.db_name)
+
+    def fetch(self, columns, kreisid=None, **kwargs):
+        with SQLiteFetcher(self.db_name, kreisid, pooled=False) as fetcher:
+            return fetcher.fetch_columns("stations", columns, order_by=["ID"], **kwargs)
+
+    def test_dtypes_follow_values(self):
+        columns = self.fetch(["ID", "P1__kW_", "Postleitzahl", "Nennleistung"])
+        self.assertEqual(columns["ID"].dtype, np.int64)
+        self.assertEqual(columns["P1__kW_"].dtype, np.float64)
+        np.testing.assert_array_equal(columns["P1__kW_"], [22.0, 3.7, np.nan])
+        self.assertEqual(columns["Postleitzahl"].dtype, object)
+        self.assertEqual(columns["Postleitzahl"].tolist(), [50667, "D-123", 50667])
+        self.assertEqual(columns["Nennleistung"].dtype, np.float64)
+
+    def test_kreisid_filter_and_empty_result(self):
+        columns = self.fetch(["ID"], kreisid=[6])
+        self.assertEqual(columns["ID"].tolist(), [3])
+        columns = self.fetch(["ID", "Nennleistung"], kreisid=[7])
+        self.assertEqual(columns["ID"].dtype, np.int64)
+        self.assertEqual(columns["Nennleistung"].dtype, np.float64)
+        self.assertEqual(len(columns["ID"]), 0)
+
+    def test_failed_dtype_override_is_reported(self):
+        self.assertEqual(self.fetch(["Postleitzahl"], dtypes={"Postleitzahl": np.int64}), {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Tests for the streaming GeoJSON writer."""
+
+import json
+import os
+import tempfile
+import unittest
+from data_handler import GeoJsonWriter
+from data_handler.geojson_writer import quantize_coordinates
+
+def feature(kreis_id, coordinates):
+    return {"type": "Feature", "id": kreis_id, "properties": {"KREISID": kreis_id},
+            "geometry": {"type": "Polygon", "coordinates": coordinates}}
+
+class GeoJsonWriterTest(unittest.TestCase):
+    """Quantizes coordinates and only replaces the target on success."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "kreise.geojson")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_quantize_coordinates(self):
+        self.assertEqual(quantize_coordinates([1.23456, 2.0], 2), [1.23, 2.0])
+        self.assertEqual(quantize_coordinates([[[1.23456, 2.0]]], 3), [[[1.235, 2.0]]])
+        # An empty ring or part does not abort the rest
+        self.assertEqual(quantize_coordinates([[], [[1.1111, 2.0]]], 3), [[], [[1.111, 2.0]]])
+        self.assertEqual(quantize_coordinates([], 3), [])
+
+    def test_write_features(self):
+        ring = [[6.0, 50.0], [6.0, 50.123456789], [6.1, 50.0], [6.0, 50.0]]
+        with GeoJsonWriter(self.path, precision=5) as writer:
+            writer.write_features([feature(1, [ring]), feature(2, [ring])])
+        with open(self.path, encoding="utf-8") as file:
+            collection = json.load(file)
+        self.assertEqual([f["id"] for f in collection["features"]], [1, 2])
+        self.assertEqual(collection["features"][0]["geometry"]["coordinates"][0][1],
+                         [6.0, 50.12346])
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_failed_write_keeps_previous_file(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("previous")
+
+        def features():
+            yield feature(1, [[[6.0, 50.0], [6.0, 50.1], [6.1, 50.0], [6.0, 50.0]]])
+            raise RuntimeError("source failed")
+
+        with self.assertRaises(RuntimeError):
+            with GeoJsonWriter(self.path) as writer:
+                writer.write_features(features())
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "previous")
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+if __name__ == "__main__":
+    unittest.main()
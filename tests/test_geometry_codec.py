@@ -0,0 +1,53 @@
+"""Tests for the binary geometry format."""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from data_handler import encode_geometry, migrate_geometry
+from data_handler.geometry_codec import decode_geometry, geometry_bbox, load_geometry
+
+POLYGON = {"rings": [[[6.0, 50.0], [6.0, 50.5], [6.5, 50.5], [6.0, 50.0]],
+                     [[6.1, 50.1], [6.2, 50.1], [6.1, 50.2], [6.1, 50.1]]]}
+
+class GeometryCodecTest(unittest.TestCase):
+    """Binary and legacy JSON geometries load the same."""
+
+    def test_round_trip(self):
+        blob = encode_geometry(POLYGON)
+        self.assertEqual(load_geometry(blob), POLYGON)
+        coords, offsets = decode_geometry(blob)
+        self.assertEqual(coords.shape, (8, 2))
+        self.assertEqual(offsets.tolist(), [0, 4, 8])
+        self.assertFalse(coords.flags.writeable)
+        self.assertEqual(load_geometry(encode_geometry({"rings": []})), {"rings": []})
+
+    def test_legacy_json_and_bbox(self):
+        text = json.dumps(POLYGON)
+        self.assertEqual(load_geometry(text), POLYGON)
+        self.assertEqual(geometry_bbox(text), (6.0, 50.0, 6.5, 50.5))
+        self.assertEqual(geometry_bbox(encode_geometry(POLYGON)), (6.0, 50.0, 6.5, 50.5))
+
+    def test_migrate_geometry(self):
+        handle, db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        try:
+            conn = sqlite3.connect(db_name)
+            with conn:
+                conn.execute("CREATE TABLE geometry (KREISID INTEGER PRIMARY KEY, GeoData)")
+                conn.executemany("INSERT INTO geometry VALUES (?, ?)",
+                                 [(1, json.dumps(POLYGON)), (2, encode_geometry(POLYGON))])
+            conn.close()
+
+            self.assertEqual(migrate_geometry(db_name), 1)
+            conn = sqlite3.connect(db_name)
+            rows = conn.execute("SELECT GeoData FROM geometry ORDER BY KREISID").fetchall()
+            conn.close()
+            self.assertEqual([load_geometry(row[0]) for row in rows], [POLYGON, POLYGON])
+            self.assertTrue(all(isinstance(row[0], bytes) for row in rows))
+        finally:
+            os.remove(db_name)
+
+if __name__ == "__main__":
+    unittest.main()
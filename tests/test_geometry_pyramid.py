@@ -0,0 +1,65 @@
+"""Tests for the level-of-detail geometry pyramid."""
+
+import math
+import os
+import sqlite3
+import tempfile
+import unittest
+from data_handler import SQLiteFetcher, build_geometry_pyramid, encode_geometry
+
+def circle_ring(x, y, count=200):
+    """A densely sampled ring that simplification visibly reduces."""
+    ring = [[x + 0.1 * math.cos(2 * math.pi * i / count),
+             y + 0.1 * math.sin(2 * math.pi * i / count)] for i in range(count)]
+    return ring + [ring[0]]
+
+class GeometryPyramidTest(unittest.TestCase):
+    """Levels are served while current and dropped when geometries change."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            conn.execute("CREATE TABLE geometry (KREISID INTEGER PRIMARY KEY, GeoData BLOB)")
+            conn.executemany("INSERT INTO geometry VALUES (?, ?)", [
+                (1, encode_geometry({"rings": [circle_ring(6.0, 50.0)]})),
+                (2, encode_geometry({"rings": [circle_ring(7.0, 50.0)]})),
+            ])
+        conn.close()
+        self.vertices = build_geometry_pyramid(self.db_name, {1: 0.01})
+
+    def tearDown(self):
+        os.remove(self.db_name)
+
+    def fetch(self, level):
+        with SQLiteFetcher(self.db_name, pooled=False) as fetcher:
+            return fetcher.fetch_geometry_data(level=level)
+
+    def vertex_count(self, rows):
+        return sum(len(ring) for row in rows for ring in row["geometry"]["rings"])
+
+    def test_levels(self):
+        self.assertLess(self.vertices[1], self.vertices[0])
+        self.assertEqual(self.vertex_count(self.fetch(1)), self.vertices[1])
+        self.assertEqual(self.vertex_count(self.fetch(0)), self.vertices[0])
+        with self.assertRaises(ValueError):
+            self.fetch(4)
+
+    def test_changed_geometry_invalidates_pyramid(self):
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            conn.execute("UPDATE geometry SET GeoData = ? WHERE KREISID = 2",
+                         (encode_geometry({"rings": [circle_ring(8.0, 50.0)]}),))
+        conn.close()
+        # The stale levels are gone, so the full resolution geometries are served
+        rows = self.fetch(1)
+        self.assertEqual(self.vertex_count(rows), self.vertices[0])
+        self.assertEqual(rows[1]["geometry"]["rings"][0][0], [8.1, 50.0])
+
+        vertices = build_geometry_pyramid(self.db_name, {1: 0.01})
+        self.assertEqual(self.vertex_count(self.fetch(1)), vertices[1])
+        self.assertLess(vertices[1], vertices[0])
+
+if __name__ == "__main__":
+    unittest.main()
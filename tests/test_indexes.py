@@ -0,0 +1,52 @@
+"""Tests for foreign key indexes and query-plan diagnostics."""
+
+import os
+import tempfile
+import unittest
+from data_handler import SQLite, SQLiteFetcher
+
+class IndexesTest(unittest.TestCase):
+    """Sub-tables index their foreign key; explain_rows reports full scans."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        reference_key = {"table": "kreis_table", "column": "KREISID",
+                         "reference_column": "KREISID"}
+        with SQLite(self.db_name) as db_conn:
+            db_conn.create_table("kreis_table", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                                 "gen": "TEXT"})
+            db_conn.create_sub_table("geometry", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                                  "GeoData": "BLOB"}, dict(reference_key))
+            db_conn.create_sub_table("stations", {"ID": "INTEGER PRIMARY KEY NOT NULL",
+                                                  "KREISID": "INTEGER"}, dict(reference_key))
+            self.indexes = {table_name: db_conn.list_indexes(table_name)
+                            for table_name in ("geometry", "stations")}
+
+    def tearDown(self):
+        os.remove(self.db_name)
+
+    def test_foreign_key_indexes(self):
+        self.assertEqual(self.indexes["geometry"], {})
+        self.assertEqual(self.indexes["stations"], {"idx_stations_KREISID": ["KREISID"]})
+
+    def test_explain_rows_matches_fetch_rows(self):
+        with SQLiteFetcher(self.db_name, kreisid=[1, 2], pooled=False) as fetcher:
+            # fetch_rows filters only stations by kreisid, so kreis_table is scanned
+            self.assertEqual(fetcher.explain_rows("kreis_table")["full_scans"], ["kreis_table"])
+            stations = fetcher.explain_rows("stations")
+            self.assertEqual(stations["full_scans"], [])
+            self.assertTrue(any("idx_stations_KREISID" in step for step in stations["plan"]))
+            self.assertEqual(fetcher.explain_rows("stations", ID=3)["full_scans"], [])
+
+    def test_alias_scans_report_the_table(self):
+        with SQLiteFetcher(self.db_name, pooled=False) as fetcher:
+            result = fetcher.explain_query(
+                "SELECT s.ID FROM stations AS s JOIN kreis_table AS k ON k.KREISID = s.KREISID"
+            )
+            self.assertEqual(len(result["full_scans"]), 1)
+            self.assertIn(result["full_scans"][0], ("stations", "kreis_table"))
+            self.assertEqual(fetcher.explain_query("SELECT 1")["full_scans"], [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Tests for the pipelined ingest."""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from data_handler import SQLite
+from data_handler.ingest_pipeline import IngestPipeline
+
+def kreis(kreis_id, x):
+    ring = [[x, 50.0], [x, 50.5], [x + 0.5, 50.5], [x + 0.5, 50.0], [x, 50.0]]
+    return {"attributes": {"OBJECTID": kreis_id, "gen": f"Kreis {kreis_id}"},
+            "geometry": {"rings": [ring]}}
+
+def fake_fetch_data(geometry, **_):
+    """Two stations per envelope, one of them outside the Kreis square."""
+    xmin = float(geometry.strip("{}").split(",")[0])
+    if xmin == 99.0:
+        raise RuntimeError("server error")
+    object_id = int(xmin * 10)
+    return [{"OBJECTID": object_id, "Längengrad": xmin + 0.25, "Breitengrad": 50.25},
+            {"OBJECTID": object_id + 1, "Längengrad": xmin + 0.25, "Breitengrad": 51.0}]
+
+class IngestPipelineTest(unittest.TestCase):
+    """Kreise, geometries and filtered stations are written by one writer."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        with SQLite(self.db_name) as db_conn:
+            db_conn.create_table("kreis_table", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                                 "gen": "TEXT"})
+            db_conn.create_table("geometry", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                              "GeoData": "BLOB"})
+            db_conn.create_table("stations", {"OBJECTID": "INTEGER PRIMARY KEY NOT NULL",
+                                              "KREISID": "INTEGER", '"Längengrad"': "REAL",
+                                              '"Breitengrad"': "REAL"})
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_name + suffix):
+                os.remove(self.db_name + suffix)
+
+    def pipeline(self, **kwargs):
+        pipeline = IngestPipeline(self.db_name, fetch_workers=2, process_workers=2, **kwargs)
+        pipeline.finder.fetch_data = fake_fetch_data
+        return pipeline
+
+    def test_run(self):
+        kreise = [kreis(1, 6.0), kreis(2, 7.0), kreis(3, 99.0)]
+        counts = self.pipeline(batch_size=2).run(kreise)
+        # Kreis 3 fails while fetching and is skipped
+        self.assertEqual(counts["kreis_table"]["inserted"], 2)
+        self.assertEqual(counts["geometry"]["inserted"], 2)
+
+        conn = sqlite3.connect(self.db_name)
+        try:
+            stations = conn.execute("SELECT OBJECTID, KREISID FROM stations ORDER BY OBJECTID")
+            self.assertEqual(stations.fetchall(), [(60, 1), (70, 2)])
+            envelope = conn.execute("SELECT envelope FROM kreis_table WHERE KREISID = 1")
+            self.assertEqual(envelope.fetchone()[0], "{6.0, 50.0, 6.5, 50.5}")
+        finally:
+            conn.close()
+
+    def test_writer_failure_does_not_hang(self):
+        pipeline = self.pipeline(queue_size=1)
+        kreise = [kreis(kreis_id, 6.0 + kreis_id / 100) for kreis_id in range(1, 60)]
+        outcome = {}
+
+        def run():
+            try:
+                pipeline.run(kreise)
+            except sqlite3.Error as error:
+                outcome["error"] = error
+
+        with patch.object(SQLite, "bulk_upsert",
+                          side_effect=sqlite3.OperationalError("database is locked")):
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            thread.join(30)
+        self.assertFalse(thread.is_alive())
+        self.assertIn("locked", str(outcome.get("error")))
+
+if __name__ == "__main__":
+    unittest.main()
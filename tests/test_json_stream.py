@@ -0,0 +1,46 @@
+"""Tests for the incremental JSON reader of ArcGIS responses."""
+
+import json
+import unittest
+from data_handler.arcgis_query import JsonStreamReader
+
+DOCUMENT = {
+    "objectIdFieldName": "OBJECTID",
+    "features": [
+        {"attributes": {"OBJECTID": 1, "Betreiber": "Stadtwerke \"Nord\"", "P1__kW_": 22.5},
+         "geometry": {"x": 6.95, "y": 50.93}},
+        {"attributes": {"OBJECTID": 12345, "Betreiber": None, "P1__kW_": 150},
+         "geometry": {"x": -1e-05, "y": 51}},
+    ],
+    "exceededTransferLimit": False,
+}
+
+def chunks(text, size):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+class JsonStreamReaderTest(unittest.TestCase):
+    """Features are decoded one at a time, whatever the chunk boundaries."""
+
+    def read(self, text, size):
+        result = {}
+        reader = JsonStreamReader(chunks(text, size))
+        for key, value in reader.iter_object(stream_keys=("features",)):
+            result[key] = list(value) if key == "features" else value
+        return result
+
+    def test_any_chunk_size(self):
+        for text in (json.dumps(DOCUMENT), json.dumps(DOCUMENT, indent=2)):
+            for size in (1, 2, 7, 64, len(text)):
+                self.assertEqual(self.read(text, size), DOCUMENT, size)
+
+    def test_empty_containers(self):
+        self.assertEqual(self.read('{"features": [ ]}', 3), {"features": []})
+        self.assertEqual(list(JsonStreamReader(["{ }"]).iter_object()), [])
+
+    def test_truncated_document(self):
+        text = json.dumps(DOCUMENT)
+        with self.assertRaises(ValueError):
+            self.read(text[:len(text) // 2], 5)
+
+if __name__ == "__main__":
+    unittest.main()
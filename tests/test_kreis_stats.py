@@ -0,0 +1,63 @@
+"""Tests for the trigger-maintained kreis_stats table."""
+
+import os
+import tempfile
+import unittest
+from data_handler import SQLite, SQLiteFetcher
+
+EXPECTED_QUERY = """
+SELECT k.KREISID, COUNT(s.OBJECTID), k.ewz FROM kreis_table AS k
+LEFT JOIN stations AS s ON s.KREISID = k.KREISID GROUP BY k.KREISID ORDER BY k.KREISID
+"""
+
+class KreisStatsTest(unittest.TestCase):
+    """kreis_stats always matches a fresh aggregate over kreis_table and stations."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.db = SQLite(self.db_name).__enter__()
+        self.db.create_table("kreis_table", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                             "ewz": "INTEGER"})
+        self.db.create_table("stations", {"OBJECTID": "INTEGER PRIMARY KEY NOT NULL",
+                                          "KREISID": "INTEGER"})
+        self.execute("INSERT INTO kreis_table VALUES (1, 1000), (2, 2000)",
+                     "INSERT INTO stations VALUES (10, 1), (11, 1), (12, 2)")
+        self.assertEqual(self.db.rebuild_kreis_stats(), 2)
+
+    def tearDown(self):
+        self.db.__exit__(None, None, None)
+        os.remove(self.db_name)
+
+    def execute(self, *statements):
+        for statement in statements:
+            self.db.cursor.execute(statement)
+        self.db.conn.commit()
+
+    def assert_in_sync(self):
+        self.db.cursor.execute("SELECT KREISID, stations, ewz FROM kreis_stats ORDER BY KREISID")
+        stats = self.db.cursor.fetchall()
+        self.db.cursor.execute(EXPECTED_QUERY)
+        self.assertEqual(stats, self.db.cursor.fetchall())
+
+    def test_triggers(self):
+        self.assert_in_sync()
+        self.execute("INSERT INTO stations VALUES (13, 3)",           # Kreis not there yet
+                     "INSERT INTO kreis_table VALUES (3, 500)",
+                     "UPDATE stations SET KREISID = 2 WHERE OBJECTID = 10",
+                     "UPDATE kreis_table SET ewz = 1500 WHERE KREISID = 1",
+                     "DELETE FROM stations WHERE OBJECTID = 11",
+                     "INSERT OR REPLACE INTO stations VALUES (12, 3)",
+                     "INSERT OR REPLACE INTO kreis_table VALUES (2, 2500)")
+        self.assert_in_sync()
+        self.execute("DELETE FROM kreis_table WHERE KREISID = 3")
+        self.assert_in_sync()
+
+    def test_fetch_kreis_stats(self):
+        with SQLiteFetcher(self.db_name, kreisid=[1], pooled=False) as fetcher:
+            rows = fetcher.fetch_kreis_stats()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["stations"], rows[0]["ewz_sta"]), (2, 500.0))
+
+if __name__ == "__main__":
+    unittest.main()
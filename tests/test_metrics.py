@@ -0,0 +1,64 @@
+"""Tests for the derived Kreis metrics."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from data_handler import close_pooled_connections
+from data_handler.metrics import KREIS_METRICS, scale_values
+
+class ScaleValuesTest(unittest.TestCase):
+    """Scaling between min and max, as set_opac does."""
+
+    def test_linear_and_reverse(self):
+        values = np.array([0.0, 5.0, 10.0, np.nan])
+        np.testing.assert_allclose(scale_values(values), [0.0, 0.5, 1.0, 0.0])
+        np.testing.assert_allclose(scale_values(values, reverse=True), [1.0, 0.5, 0.0, 1.0])
+
+    def test_log_and_quantile(self):
+        values = np.array([0.0, 9.0, 99.0])
+        np.testing.assert_allclose(scale_values(values, "log", 10), [0.0, 0.5, 1.0])
+        np.testing.assert_allclose(scale_values(np.array([3.0, 1.0, 1.0]), "quantile"),
+                                   [1.0, 0.0, 0.0])
+
+    def test_constant_column(self):
+        self.assertTrue(np.isnan(scale_values(np.array([2.0, 2.0]))).all())
+
+class KreisMetricsTest(unittest.TestCase):
+    """Features and database rows get the same metrics."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            conn.execute("CREATE TABLE kreis_table "
+                         "(KREISID INTEGER PRIMARY KEY, ewz INTEGER, stations INTEGER)")
+            conn.executemany("INSERT INTO kreis_table VALUES (?, ?, ?)",
+                             [(1, 1000, 10), (2, 5000, 0), (3, 2500.5, 5)])
+        conn.close()
+
+    def tearDown(self):
+        close_pooled_connections(self.db_name)
+        os.remove(self.db_name)
+
+    def test_features_match_db(self):
+        features = [{"properties": {"KREISID": 1, "ewz": 1000, "stations": 10}},
+                     {"properties": {"KREISID": 2, "ewz": 5000, "stations": 0}},
+                     {"properties": {"KREISID": 3, "ewz": 2500.5, "stations": 5}}]
+        names = ["ewz_sta", "opac_ewz"]
+        KREIS_METRICS.apply_features(features, names)
+        self.assertIsNone(features[1]["properties"]["ewz_sta"])
+
+        result = KREIS_METRICS.evaluate_db(self.db_name, names, cache=None)
+        self.assertEqual(result["KREISID"].tolist(), [1, 2, 3])
+        # The REAL stored in the INTEGER column is not truncated
+        self.assertAlmostEqual(result["ewz_sta"][2], 500.1)
+        for name in names:
+            expected = [np.nan if feature["properties"][name] is None
+                        else feature["properties"][name] for feature in features]
+            np.testing.assert_allclose(result[name], expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Tests for the version-invalidated result cache."""
+
+import gc
+import os
+import sqlite3
+import tempfile
+import unittest
+from data_handler import ResultCache, SQLiteFetcher, close_pooled_connections
+
+class ResultCacheTest(unittest.TestCase):
+    """Results are reused until the database changes."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.write("CREATE TABLE kreis_table (KREISID INTEGER PRIMARY KEY, gen TEXT)",
+                   "INSERT INTO kreis_table VALUES (1, 'Köln')")
+        self.cache = ResultCache()
+
+    def tearDown(self):
+        close_pooled_connections(self.db_name)
+        os.remove(self.db_name)
+
+    def write(self, *statements):
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+        conn.close()
+
+    def fetch(self, pooled=True):
+        with SQLiteFetcher(self.db_name, pooled=pooled, cache=self.cache) as fetcher:
+            return [row["gen"] for row in fetcher.fetch_kreise()]
+
+    def test_hit_and_invalidation(self):
+        self.assertEqual(self.fetch(), ["Köln"])
+        self.assertEqual(self.fetch(), ["Köln"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.write("INSERT INTO kreis_table VALUES (2, 'Bonn')")
+        self.assertEqual(self.fetch(), ["Köln", "Bonn"])
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_versions_do_not_outlive_connections(self):
+        for _ in range(5):
+            self.assertEqual(self.fetch(pooled=False), ["Köln"])
+        gc.collect()
+        self.assertEqual(len(self.cache.versions), 0)
+
+        self.fetch()
+        self.assertEqual(len(self.cache.versions), 1)
+        close_pooled_connections(self.db_name)
+        gc.collect()
+        self.assertEqual(len(self.cache.versions), 0)
+
+if __name__ == "__main__":
+    unittest.main()
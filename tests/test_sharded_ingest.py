@@ -0,0 +1,61 @@
+"""Tests for merging ingest shards into the target database."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from data_handler.sharded_ingest import ShardedIngest
+
+SCHEMA = [
+    "CREATE TABLE kreis_table (KREISID INTEGER PRIMARY KEY NOT NULL, gen TEXT)",
+    "CREATE TABLE geometry (KREISID INTEGER PRIMARY KEY NOT NULL, GeoData BLOB)",
+    "CREATE TABLE stations (ID INTEGER PRIMARY KEY NOT NULL, KREISID INTEGER, Betreiber TEXT)",
+]
+
+class MergeTest(unittest.TestCase):
+    """Shards are upserted without touching columns they do not have."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, "target.db")
+        self.shard = os.path.join(self.directory.name, "shard0.db")
+        for path in (self.db_name, self.shard):
+            conn = sqlite3.connect(path)
+            with conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+            conn.close()
+
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            conn.execute("ALTER TABLE kreis_table ADD COLUMN score REAL")
+            conn.execute("INSERT INTO kreis_table VALUES (1, 'Old', 0.5)")
+            conn.execute("CREATE TABLE deleted (KREISID INTEGER)")
+            conn.execute("CREATE TRIGGER kreis_deleted AFTER DELETE ON kreis_table "
+                         "BEGIN INSERT INTO deleted VALUES (OLD.KREISID); END")
+        conn.close()
+
+        conn = sqlite3.connect(self.shard)
+        with conn:
+            conn.executemany("INSERT INTO kreis_table VALUES (?, ?)", [(1, "New"), (2, "Other")])
+            conn.execute("INSERT INTO geometry VALUES (1, x'00')")
+            conn.execute("INSERT INTO stations VALUES (10, 1, 'Operator')")
+        conn.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_merge_updates_in_place(self):
+        merged = ShardedIngest(self.db_name).merge([self.shard])
+        self.assertEqual(merged, {"kreis_table": 2, "geometry": 1, "stations": 1})
+
+        conn = sqlite3.connect(self.db_name)
+        try:
+            rows = conn.execute("SELECT KREISID, gen, score FROM kreis_table ORDER BY KREISID")
+            self.assertEqual(rows.fetchall(), [(1, "New", 0.5), (2, "Other", None)])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM deleted").fetchone(), (0,))
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Tests for the R*Tree bbox queries."""
+
+import os
+import tempfile
+import unittest
+from data_handler import SQLite, SQLiteFetcher, encode_geometry
+
+def envelope(xmin, ymin, xmax, ymax):
+    """An envelope string as stored by get_envelope."""
+    return f"{{{xmin}, {ymin}, {xmax}, {ymax}}}"
+
+class SpatialIndexTest(unittest.TestCase):
+    """kreis_rtree and stations_rtree follow later writes."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        with SQLite(self.db_name) as db_conn:
+            db_conn.create_table("kreis_table", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                                 "envelope": "TEXT"})
+            db_conn.create_table("geometry", {"KREISID": "INTEGER PRIMARY KEY NOT NULL",
+                                              "GeoData": "BLOB"})
+            db_conn.create_table("stations", {"OBJECTID": "INTEGER PRIMARY KEY NOT NULL",
+                                              "KREISID": "INTEGER", '"Längengrad"': "REAL",
+                                              '"Breitengrad"': "REAL"})
+            db_conn.cursor.execute("INSERT INTO kreis_table VALUES (1, NULL)")
+            ring = [[6.0, 50.0], [6.0, 50.5], [6.5, 50.5], [6.5, 50.0], [6.0, 50.0]]
+            db_conn.cursor.execute("INSERT INTO geometry VALUES (1, ?)",
+                                   (encode_geometry({"rings": [ring]}),))
+            db_conn.cursor.execute("INSERT INTO stations VALUES (10, 1, 6.2, 50.2)")
+            db_conn.conn.commit()
+            db_conn.create_spatial_index()
+
+            # Written after the index build
+            db_conn.cursor.execute("INSERT INTO kreis_table (KREISID, envelope) VALUES (?, ?)",
+                                   (2, envelope(7.0, 51.0, 7.5, 51.5)))
+            db_conn.cursor.execute("INSERT INTO stations VALUES (11, 2, 7.2, 51.2)")
+            db_conn.bulk_upsert("kreis_table", "KREISID",
+                                [{"KREISID": 3, "envelope": envelope(8.0, 52.0, 8.5, 52.5)}])
+            db_conn.conn.commit()
+
+    def tearDown(self):
+        os.remove(self.db_name)
+
+    def kreise_in(self, *bbox):
+        with SQLiteFetcher(self.db_name, pooled=False) as fetcher:
+            return sorted(row["KREISID"] for row in fetcher.fetch_kreise_in_bbox(*bbox))
+
+    def stations_in(self, *bbox):
+        with SQLiteFetcher(self.db_name, pooled=False) as fetcher:
+            return sorted(row["OBJECTID"] for row in fetcher.fetch_stations_in_bbox(*bbox))
+
+    def test_kreise_in_bbox(self):
+        self.assertEqual(self.kreise_in(6.4, 50.4, 7.1, 51.1), [1, 2])
+        self.assertEqual(self.kreise_in(8.4, 52.4, 9.0, 53.0), [3])
+        self.assertEqual(self.kreise_in(6.6, 50.6, 6.9, 50.9), [])
+        # The exact bounds are re-checked behind the 32-bit R*Tree boxes
+        self.assertEqual(self.kreise_in(6.5000001, 50.0, 6.9, 50.9), [])
+
+    def test_stations_follow_updates(self):
+        self.assertEqual(self.stations_in(6.0, 50.0, 7.9, 51.9), [10, 11])
+        with SQLite(self.db_name) as db_conn:
+            db_conn.cursor.execute('UPDATE stations SET "Längengrad" = 9.0 WHERE OBJECTID = 10')
+            db_conn.cursor.execute("DELETE FROM kreis_table WHERE KREISID = 2")
+            db_conn.conn.commit()
+        self.assertEqual(self.stations_in(6.0, 50.0, 7.9, 51.9), [11])
+        self.assertEqual(self.kreise_in(6.0, 50.0, 7.9, 51.9), [1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Tests for the concurrent station harvest."""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from data_handler.stations_async import AsyncStationsFinder, stations_find_many
+from data_handler.stations_find import StationsFinder
+
+class AsyncStationsFinderTest(unittest.TestCase):
+    """Queries run concurrently and closing does not block the event loop."""
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow_fetch(self, geometry, **_):
+        if geometry == "slow":
+            self.release.wait(5)
+        return [{"envelope": geometry}]
+
+    def test_early_break_does_not_wait(self):
+        async def first():
+            with AsyncStationsFinder(concurrency=2) as finder:
+                finder.finder.fetch_data = self.slow_fetch
+                async for result in finder.harvest({1: "fast", 2: "slow", 3: "slow"}):
+                    return result
+
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(first()), (1, [{"envelope": "fast"}]))
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_find_many_inside_running_loop(self):
+        async def inside_loop():
+            return stations_find_many({1: "a", 2: "b"})
+
+        with patch.object(StationsFinder, "fetch_data",
+                          lambda _, **kwargs: self.slow_fetch(**kwargs)):
+            result = asyncio.run(inside_loop())
+        self.assertEqual(result, {1: [{"envelope": "a"}], 2: [{"envelope": "b"}]})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+"""Tests for the point-in-Kreis filter of the station finder."""
+
+import unittest
+from data_handler.stations_find import filter_stations, polygon_geometry
+
+def square(xmin, ymin, xmax, ymax):
+    return [[xmin, ymin], [xmin, ymax], [xmax, ymax], [xmax, ymin], [xmin, ymin]]
+
+def station(station_id, longitude, latitude):
+    return {"ID": station_id, "Längengrad": longitude, "Breitengrad": latitude}
+
+class PolygonGeometryTest(unittest.TestCase):
+    """Rings are combined with the even-odd rule."""
+
+    def test_holes_and_islands(self):
+        polygon = {"rings": [square(0, 0, 4, 4), square(1, 1, 2, 2), square(5, 5, 6, 6)]}
+        self.assertAlmostEqual(polygon_geometry(polygon).area, 16.0)
+        stations = [station(1, 3, 3), station(2, 1.5, 1.5), station(3, 5.5, 5.5),
+                    station(4, 7, 7), station(5, None, None)]
+        self.assertEqual([entry["ID"] for entry in filter_stations(polygon, stations)], [1, 3])
+
+    def test_invalid_rings(self):
+        # A bowtie ring and a degenerate ring are repaired or dropped, not raised
+        polygon = {"rings": [[[0, 0], [2, 2], [2, 0], [0, 2], [0, 0]], [[0, 0], [1, 1]]]}
+        self.assertAlmostEqual(polygon_geometry(polygon).area, 2.0)
+        self.assertTrue(polygon_geometry({"rings": []}).is_empty)
+
+if __name__ == "__main__":
+    unittest.main()
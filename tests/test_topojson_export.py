@@ -0,0 +1,82 @@
+"""Round-trip test for the TopoJSON export of Kreis geometries."""
+
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from shapely.geometry import Polygon, shape
+from data_handler import close_pooled_connections, encode_geometry
+from data_handler.topojson_export import build_topology, export_topojson, load_topojson
+
+def square(xmin, ymin, xmax, ymax):
+    """Clockwise ring of a rectangle, as ArcGIS stores outer rings."""
+    return [[xmin, ymin], [xmin, ymax], [xmax, ymax], [xmax, ymin], [xmin, ymin]]
+
+# Kreis 1 with a hole filled by the enclave Kreis 3, and Kreis 2 next to Kreis 1
+KREISE = {
+    1: {"gen": "Outer", "rings": [square(6.0, 50.0, 6.4, 50.4), square(6.1, 50.1, 6.2, 50.2)]},
+    2: {"gen": "Neighbour", "rings": [square(6.4, 50.0, 6.8, 50.4)]},
+    3: {"gen": "Enclave", "rings": [square(6.1, 50.1, 6.2, 50.2)]},
+}
+
+def kreis_shape(rings):
+    """The shapely geometry of the test rings: the first is the shell, the rest holes."""
+    return Polygon(rings[0], rings[1:])
+
+class TopoJsonRoundTripTest(unittest.TestCase):
+    """Exports adjacent Kreise and an enclave and loads them back."""
+
+    def setUp(self):
+        handle, self.db_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.db_name)
+        with conn:
+            conn.execute("CREATE TABLE kreis_table (KREISID INTEGER PRIMARY KEY, gen TEXT)")
+            conn.execute("CREATE TABLE geometry (KREISID INTEGER PRIMARY KEY, GeoData BLOB)")
+            for kreis_id, kreis in KREISE.items():
+                conn.execute("INSERT INTO kreis_table VALUES (?, ?)", (kreis_id, kreis["gen"]))
+                conn.execute("INSERT INTO geometry VALUES (?, ?)",
+                             (kreis_id, encode_geometry({"rings": kreis["rings"]})))
+        conn.close()
+
+    def tearDown(self):
+        close_pooled_connections(self.db_name)
+        os.remove(self.db_name)
+
+    def assert_round_trip(self, collection):
+        """Each loaded feature matches its source polygon up to the quantization."""
+        features = {feature["id"]: feature for feature in collection["features"]}
+        self.assertEqual(set(features), set(KREISE))
+        for kreis_id, kreis in KREISE.items():
+            loaded = shape(features[kreis_id]["geometry"])
+            expected = kreis_shape(kreis["rings"])
+            self.assertTrue(loaded.is_valid, kreis_id)
+            self.assertLess(loaded.hausdorff_distance(expected), 1e-5)
+            self.assertLess(loaded.symmetric_difference(expected).area, 1e-5)
+            self.assertEqual(features[kreis_id]["properties"]["gen"], kreis["gen"])
+
+    def test_shared_borders_are_stored_once(self):
+        topology = build_topology(self.db_name, columns=["gen"])
+        geometries = {geometry["id"]: geometry
+                      for geometry in topology["objects"]["kreise"]["geometries"]}
+
+        def arcs_of(kreis_id):
+            return {index if index >= 0 else ~index
+                    for ring in geometries[kreis_id]["arcs"] for index in ring}
+
+        # The border of Kreis 1 and 2 and the ring of the enclave are shared,
+        # leaving one more arc for the rest of each outer ring
+        self.assertEqual(len(arcs_of(1) & arcs_of(2)), 1)
+        self.assertEqual(arcs_of(3), arcs_of(3) & arcs_of(1))
+        self.assertEqual(len(topology["arcs"]), 4)
+        self.assert_round_trip(load_topojson(topology))
+
+    def test_json_round_trip(self):
+        buffer = io.StringIO()
+        export_topojson(self.db_name, buffer, columns=["gen"])
+        buffer.seek(0)
+        self.assert_round_trip(load_topojson(buffer))
+
+if __name__ == "__main__":
+    unittest.main()